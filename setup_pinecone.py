@@ -11,6 +11,7 @@ Usage:
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Set environment variables before imports
 os.environ.setdefault("AWS_REGION", "ap-south-1")
@@ -55,7 +56,7 @@ def main():
     # Load and ingest data
     print("\n📊 Loading farmer dataset...")
     import pandas as pd
-    from src.embeddings.embed import embed_text
+    from src.embeddings.cache import cached_embed
     
     df = pd.read_csv(os.path.join(project_root, "data", "farmer_dataset.csv"))
     print(f"   Found {len(df)} records")
@@ -63,46 +64,68 @@ def main():
     index = pc.Index(index_name)
     
     print("\n🚀 Ingesting data (this may take a few minutes)...")
+
+    # Iterate plain dicts instead of iterrows() — avoids building a
+    # pandas Series per row
+    records = df.to_dict(orient="records")
+
+    # Create text representations for embedding
+    texts = [
+        f"Farmer {row.get('farmer_name', 'Unknown')} in {row.get('location_state', 'Unknown')} with {row.get('soil_type', 'Unknown')} soil. Recommended crop: {row.get('recommended_crop', 'Unknown')}. Weather: {row.get('weather_condition', 'Unknown')}."
+        for row in records
+    ]
+
+    # Embed concurrently — Bedrock calls are network-bound, so overlapping
+    # them gives near-linear speedup up to the account's RPS quota.
+    # Futures are collected one by one so a single bad record is skipped
+    # instead of aborting the whole ingestion.
+    print(f"   Embedding {len(texts)} records with 16 workers...")
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        futures = [executor.submit(cached_embed, text) for text in texts]
+        embeddings = []
+        for i, future in enumerate(futures):
+            try:
+                embeddings.append(future.result())
+            except Exception as e:
+                print(f"⚠️ Error processing record {i}: {e}")
+                embeddings.append(None)
+
+    # Assemble vectors and upsert in batches of 100, issuing the upserts
+    # asynchronously so they overlap on the network as well
+    upsert_futures = []
     vectors_to_upsert = []
-    
-    for i, row in df.iterrows():
-        # Create text representation for embedding
-        text = f"Farmer {row.get('farmer_name', 'Unknown')} in {row.get('location_state', 'Unknown')} with {row.get('soil_type', 'Unknown')} soil. Recommended crop: {row.get('recommended_crop', 'Unknown')}. Weather: {row.get('weather_condition', 'Unknown')}."
-        
-        print(f"   Processing record {i+1}/{len(df)}...", end="\r")
-        
-        try:
-            embedding = embed_text(text)
-            
-            metadata = {
-                "farmer_name": str(row.get('farmer_name', '')),
-                "location_state": str(row.get('location_state', '')),
-                "soil_type": str(row.get('soil_type', '')),
-                "recommended_crop": str(row.get('recommended_crop', '')),
-                "weather_condition": str(row.get('weather_condition', '')),
-                "text": text
-            }
-            
-            vectors_to_upsert.append({
-                "id": f"farmer_{i}",
-                "values": embedding,
-                "metadata": metadata
-            })
-            
-            # Batch upsert every 50 records
-            if len(vectors_to_upsert) >= 50:
-                index.upsert(vectors=vectors_to_upsert)
-                vectors_to_upsert = []
-                
-        except Exception as e:
-            print(f"\n   ⚠️  Error processing record {i}: {e}")
+
+    ingested = 0
+    for i, (row, text, embedding) in enumerate(zip(records, texts, embeddings)):
+        if embedding is None:
             continue
-    
-    # Upsert remaining vectors
+        ingested += 1
+        metadata = {
+            "farmer_name": str(row.get('farmer_name', '')),
+            "location_state": str(row.get('location_state', '')),
+            "soil_type": str(row.get('soil_type', '')),
+            "recommended_crop": str(row.get('recommended_crop', '')),
+            "weather_condition": str(row.get('weather_condition', '')),
+            "text": text
+        }
+
+        vectors_to_upsert.append({
+            "id": f"farmer_{i}",
+            "values": embedding,
+            "metadata": metadata
+        })
+
+        if len(vectors_to_upsert) >= 100:
+            upsert_futures.append(index.upsert(vectors=vectors_to_upsert, async_req=True))
+            vectors_to_upsert = []
+
+    # Upsert remaining vectors and wait for the async batches to land
     if vectors_to_upsert:
-        index.upsert(vectors=vectors_to_upsert)
+        upsert_futures.append(index.upsert(vectors=vectors_to_upsert, async_req=True))
+    for future in upsert_futures:
+        future.get()
     
-    print(f"\n\n✅ Successfully ingested {len(df)} records into Pinecone!")
+    print(f"\n\n✅ Successfully ingested {ingested} of {len(df)} records into Pinecone!")
     print(f"\n🎉 Setup complete! You can now run:")
     print(f'   python local_test.py "What crops are best for sandy soil?"')
 
@@ -0,0 +1,29 @@
+# Multi-agent layer: declarative schemas for the specialist agents an
+# orchestrator can invoke on top of the RAG pipeline.
+
+SOIL_AGENT_SCHEMA = {
+    "name": "soil",
+    "description": "Analyzes soil type, pH and nutrient levels from the query and learned regional profiles",
+    "inputs": ["query", "context"],
+    "outputs": ["type", "ph", "npk_levels", "health_score", "constraints", "recommendations"],
+}
+
+WEATHER_AGENT_SCHEMA = {
+    "name": "weather",
+    "description": "Resolves location to live or historical weather and assesses crop suitability",
+    "inputs": ["query", "context"],
+    "outputs": ["temperature_range", "rainfall", "season", "risk_assessment", "suitability"],
+}
+
+CROP_PLANNING_AGENT_SCHEMA = {
+    "name": "crop_planning",
+    "description": "Recommends crops with economics, varieties and applicable government schemes",
+    "inputs": ["query", "context", "soil_data", "weather_data"],
+    "outputs": ["recommended_crops", "alternatives", "risk_assessment", "precautions"],
+}
+
+AGENT_SCHEMAS = {
+    "soil": SOIL_AGENT_SCHEMA,
+    "weather": WEATHER_AGENT_SCHEMA,
+    "crop_planning": CROP_PLANNING_AGENT_SCHEMA,
+}
@@ -0,0 +1,850 @@
+"""Crop planning agent.
+
+Combines the soil and weather agents' outputs with a static crop
+knowledge base and RAG context to recommend crops, their economics,
+suitable varieties and applicable government schemes.
+"""
+
+import functools
+import heapq
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from config import PLAN_LOW_CONF_GATE
+from rag.retrieve import retrieve_documents
+from utils import jsonio
+from utils.jit import njit
+from utils.logger import logger
+
+# Static knowledge base: costs in INR/ha, yields in kg/ha, prices and
+# MSP in INR/quintal
+CROP_DATABASE = {
+    "rice": {
+        "suitable_soil": ["clay", "loam", "alluvial"],
+        "water_requirement": "very_high",
+        "seasons": ["kharif"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 3800,
+        "price_min": 1900, "price_max": 2500, "msp_2024": 2300,
+        "input_costs": {"seeds": 2500, "fertilizers": 7000, "irrigation": 5000, "pesticides": 3000},
+        "varieties": {
+            "drought": [
+                {"name": "Sahbhagi Dhan", "type": "drought_tolerant", "reason": "Survives 2-3 week dry spells"},
+                {"name": "DRR Dhan 42", "type": "drought_tolerant", "reason": "Bred for rainfed uplands"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "MTU-1010", "type": "high_yield", "reason": "Short duration with high tillering"},
+                {"name": "Swarna Sub-1", "type": "high_yield", "reason": "Submergence tolerant, stable yields"},
+            ],
+            "resilient": [
+                {"name": "Swarna Sub-1", "type": "resilient", "reason": "Tolerates 2 weeks of flooding"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "wheat": {
+        "suitable_soil": ["loam", "clay", "alluvial"],
+        "water_requirement": "medium",
+        "seasons": ["rabi"],
+        "duration_months": 5,
+        "expected_yield_kg_ha": 3500,
+        "price_min": 2100, "price_max": 2700, "msp_2024": 2275,
+        "input_costs": {"seeds": 3000, "fertilizers": 6000, "irrigation": 3500, "pesticides": 2000},
+        "varieties": {
+            "drought": [
+                {"name": "HD-3086", "type": "drought_tolerant", "reason": "Performs under restricted irrigation"},
+            ],
+            "frost": [
+                {"name": "PBW-723", "type": "frost_tolerant", "reason": "Cold tolerant at tillering stage"},
+            ],
+            "high_yield": [
+                {"name": "HD-2967", "type": "high_yield", "reason": "Widely adapted, high yield potential"},
+            ],
+            "resilient": [
+                {"name": "DBW-187", "type": "resilient", "reason": "Heat tolerant late-sown variety"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "maize": {
+        "suitable_soil": ["loam", "sandy", "alluvial", "red"],
+        "water_requirement": "medium",
+        "seasons": ["kharif", "rabi"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 3000,
+        "price_min": 1700, "price_max": 2300, "msp_2024": 2090,
+        "input_costs": {"seeds": 3500, "fertilizers": 5500, "irrigation": 2500, "pesticides": 2500},
+        "varieties": {
+            "drought": [
+                {"name": "Pusa Vivek QPM-9", "type": "drought_tolerant", "reason": "Early maturity escapes terminal drought"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "DHM-117", "type": "high_yield", "reason": "Hybrid with strong kharif performance"},
+            ],
+            "resilient": [
+                {"name": "HQPM-1", "type": "resilient", "reason": "Quality protein maize, stable across zones"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "cotton": {
+        "suitable_soil": ["black", "alluvial"],
+        "water_requirement": "high",
+        "seasons": ["kharif"],
+        "duration_months": 6,
+        "expected_yield_kg_ha": 1800,
+        "price_min": 6000, "price_max": 7500, "msp_2024": 7121,
+        "input_costs": {"seeds": 4500, "fertilizers": 8000, "irrigation": 6000, "pesticides": 6000},
+        "varieties": {
+            "drought": [
+                {"name": "Suraj", "type": "drought_tolerant", "reason": "Compact plant for rainfed tracts"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "Bt RCH-659", "type": "high_yield", "reason": "Bollworm resistant hybrid"},
+            ],
+            "resilient": [
+                {"name": "DCH-32", "type": "resilient", "reason": "Long staple, tolerates moisture stress"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY", "KCC"],
+    },
+    "sugarcane": {
+        "suitable_soil": ["loam", "clay", "alluvial"],
+        "water_requirement": "very_high",
+        "seasons": ["kharif", "rabi"],
+        "duration_months": 12,
+        "expected_yield_kg_ha": 70000,
+        "price_min": 310, "price_max": 380, "msp_2024": 340,
+        "input_costs": {"seeds": 12000, "fertilizers": 10000, "irrigation": 9000, "pesticides": 3000},
+        "varieties": {
+            "drought": [
+                {"name": "Co-0238", "type": "drought_tolerant", "reason": "High sucrose under moisture stress"},
+            ],
+            "frost": [
+                {"name": "CoS-767", "type": "frost_tolerant", "reason": "Suited to subtropical winters"},
+            ],
+            "high_yield": [
+                {"name": "Co-86032", "type": "high_yield", "reason": "Benchmark tropical variety"},
+            ],
+            "resilient": [],
+        },
+        "government_schemes": ["PM-KISAN", "KCC"],
+    },
+    "groundnut": {
+        "suitable_soil": ["sandy", "red", "loam"],
+        "water_requirement": "low",
+        "seasons": ["kharif", "rabi"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 1600,
+        "price_min": 5500, "price_max": 6800, "msp_2024": 6377,
+        "input_costs": {"seeds": 6000, "fertilizers": 3500, "irrigation": 1500, "pesticides": 2000},
+        "varieties": {
+            "drought": [
+                {"name": "TAG-24", "type": "drought_tolerant", "reason": "Short duration, rainfed friendly"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "TG-37A", "type": "high_yield", "reason": "High pod yield, wide adaptation"},
+            ],
+            "resilient": [
+                {"name": "GG-20", "type": "resilient", "reason": "Tolerates end-season moisture stress"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "soybean": {
+        "suitable_soil": ["black", "loam", "clay"],
+        "water_requirement": "medium",
+        "seasons": ["kharif"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 1500,
+        "price_min": 4200, "price_max": 5200, "msp_2024": 4892,
+        "input_costs": {"seeds": 4000, "fertilizers": 3000, "irrigation": 1000, "pesticides": 2500},
+        "varieties": {
+            "drought": [
+                {"name": "JS-9560", "type": "drought_tolerant", "reason": "Early maturity escapes dry spells"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "JS-2034", "type": "high_yield", "reason": "High yield in central India"},
+            ],
+            "resilient": [
+                {"name": "NRC-86", "type": "resilient", "reason": "Shattering tolerant"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "mustard": {
+        "suitable_soil": ["loam", "sandy", "alluvial"],
+        "water_requirement": "low",
+        "seasons": ["rabi"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 1300,
+        "price_min": 5000, "price_max": 6000, "msp_2024": 5650,
+        "input_costs": {"seeds": 800, "fertilizers": 3000, "irrigation": 1500, "pesticides": 1200},
+        "varieties": {
+            "drought": [
+                {"name": "RH-725", "type": "drought_tolerant", "reason": "Suited to conserved-moisture sowing"},
+            ],
+            "frost": [
+                {"name": "RGN-73", "type": "frost_tolerant", "reason": "Tolerates cold waves at flowering"},
+            ],
+            "high_yield": [
+                {"name": "Pusa Bold", "type": "high_yield", "reason": "Bold seeded, high oil content"},
+            ],
+            "resilient": [],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "chickpea": {
+        "suitable_soil": ["black", "loam", "sandy"],
+        "water_requirement": "low",
+        "seasons": ["rabi"],
+        "duration_months": 4,
+        "expected_yield_kg_ha": 1200,
+        "price_min": 4800, "price_max": 5800, "msp_2024": 5440,
+        "input_costs": {"seeds": 3500, "fertilizers": 2000, "irrigation": 1000, "pesticides": 1500},
+        "varieties": {
+            "drought": [
+                {"name": "JG-11", "type": "drought_tolerant", "reason": "Deep rooted, rainfed staple"},
+            ],
+            "frost": [
+                {"name": "GNG-1581", "type": "frost_tolerant", "reason": "Cold tolerant in north India"},
+            ],
+            "high_yield": [
+                {"name": "Pusa-372", "type": "high_yield", "reason": "Stable yields across zones"},
+            ],
+            "resilient": [],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "pigeon_pea": {
+        "suitable_soil": ["red", "black", "loam"],
+        "water_requirement": "low",
+        "seasons": ["kharif"],
+        "duration_months": 6,
+        "expected_yield_kg_ha": 1000,
+        "price_min": 6500, "price_max": 8000, "msp_2024": 7550,
+        "input_costs": {"seeds": 1500, "fertilizers": 2000, "irrigation": 500, "pesticides": 2000},
+        "varieties": {
+            "drought": [
+                {"name": "Maruti", "type": "drought_tolerant", "reason": "Hardy in dryland conditions"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "ICPH-2740", "type": "high_yield", "reason": "Hybrid with wilt resistance"},
+            ],
+            "resilient": [
+                {"name": "BDN-711", "type": "resilient", "reason": "Wilt and sterility-mosaic tolerant"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement", "PMFBY"],
+    },
+    "millet": {
+        "suitable_soil": ["sandy", "red", "loam"],
+        "water_requirement": "low",
+        "seasons": ["kharif"],
+        "duration_months": 3,
+        "expected_yield_kg_ha": 1100,
+        "price_min": 2200, "price_max": 2900, "msp_2024": 2625,
+        "input_costs": {"seeds": 500, "fertilizers": 1500, "irrigation": 500, "pesticides": 800},
+        "varieties": {
+            "drought": [
+                {"name": "HHB-67", "type": "drought_tolerant", "reason": "Extra early, escapes drought"},
+            ],
+            "frost": [],
+            "high_yield": [
+                {"name": "Pusa Composite-443", "type": "high_yield", "reason": "High grain and fodder yield"},
+            ],
+            "resilient": [
+                {"name": "RHB-177", "type": "resilient", "reason": "Downy mildew resistant"},
+            ],
+        },
+        "government_schemes": ["PM-KISAN", "MSP Procurement"],
+    },
+}
+
+@dataclass(frozen=True, slots=True)
+class CropInfo:
+    """Frozen per-crop record: attribute reads are C-level slot loads
+    instead of dict hashing, and defaults are resolved once here."""
+    name: str
+    suitable_soil: frozenset
+    water_requirement: str
+    seasons: frozenset
+    duration_months: int
+    expected_yield_kg_ha: int
+    price_min: int
+    price_max: int
+    msp_2024: Optional[int]
+    varieties: dict
+    government_schemes: tuple
+
+_CROP_INFO = {
+    name: CropInfo(
+        name=name,
+        suitable_soil=frozenset(info["suitable_soil"]),
+        water_requirement=info["water_requirement"],
+        seasons=frozenset(info["seasons"]),
+        duration_months=info["duration_months"],
+        expected_yield_kg_ha=info.get("expected_yield_kg_ha", 1500),
+        price_min=info.get("price_min", 2000),
+        price_max=info.get("price_max", 2500),
+        msp_2024=info.get("msp_2024"),
+        varieties=info.get("varieties", {}),
+        government_schemes=tuple(info.get("government_schemes", ())),
+    )
+    for name, info in CROP_DATABASE.items()
+}
+
+# Irrigation requirement folded to a bool at import
+_NEEDS_IRRIGATION = {
+    name: info.water_requirement in ("very_high", "high") for name, info in _CROP_INFO.items()
+}
+
+# Structure-of-arrays economics table, one row per crop in CROP_DATABASE
+# order: all revenue/profit/ROI math runs as vectorized numpy expressions
+# over the selected rows instead of per-crop Python arithmetic
+_CROP_ROW = {name: i for i, name in enumerate(CROP_DATABASE)}
+
+# Resolve each crop's input costs (seeds, fertilizers, irrigation,
+# pesticides, total) exactly once; everything downstream reads these
+# tuples or the arrays derived from them
+_INPUT_COSTS = {
+    crop: (
+        costs.get("seeds", 0),
+        costs.get("fertilizers", 0),
+        costs.get("irrigation", 0),
+        costs.get("pesticides", 0),
+        sum(costs.values()),
+    )
+    for crop, info in CROP_DATABASE.items()
+    for costs in [info.get("input_costs", {})]
+}
+_COST_SEEDS, _COST_FERTILIZERS, _COST_IRRIGATION, _COST_PESTICIDES, _COST_TOTAL = (
+    np.array(column, dtype=np.float64) for column in zip(*_INPUT_COSTS.values())
+)
+_YIELD_KG_HA = np.array([info.get("expected_yield_kg_ha", 1500) for info in CROP_DATABASE.values()], dtype=np.float64)
+_PRICE_MIN = np.array([info.get("price_min", 2000) for info in CROP_DATABASE.values()], dtype=np.float64)
+_PRICE_MAX = np.array([info.get("price_max", 2500) for info in CROP_DATABASE.values()], dtype=np.float64)
+_MSP_2024 = [info.get("msp_2024") for info in CROP_DATABASE.values()]
+
+# Reverse index soil_type -> compatible crops so candidate selection is a
+# single dict hit instead of a full CROP_DATABASE scan
+_CROPS_ALL = tuple(CROP_DATABASE)
+_CROPS_BY_SOIL = {}
+for _crop, _info in CROP_DATABASE.items():
+    for _soil in _info["suitable_soil"]:
+        _CROPS_BY_SOIL.setdefault(_soil, []).append(_crop)
+_CROPS_BY_SOIL = {soil: tuple(crops) for soil, crops in _CROPS_BY_SOIL.items()}
+
+# Every candidate the indexes can surface is a CROP_DATABASE key, so the
+# per-crop helpers skip unknown-crop guards (checked once here; assert
+# is a no-op under -O)
+assert set(_CROPS_ALL) == set(_CROP_INFO) == set(_CROP_ROW)
+
+# Per-soil boolean compatibility rows plus an MSP flag vector, aligned to
+# _CROP_ROW order, so confidence scoring runs as one vectorized
+# expression over every candidate instead of per-crop Python arithmetic
+_HAS_MSP_ARR = np.array([bool(msp) for msp in _MSP_2024])
+_SOIL_MATCH = {
+    soil: np.array([soil in info.suitable_soil for info in _CROP_INFO.values()])
+    for soil in _CROPS_BY_SOIL
+}
+_NO_SOIL_MATCH = np.zeros(len(_CROP_INFO), dtype=bool)
+
+def plan_crops(query, context, soil_data, weather_data):
+    """Produce crop recommendations from soil and weather analyses.
+
+    The expensive body is memoized on a canonicalized key — many farmer
+    queries reduce to the same (soil, weather, season, farm) tuple, and
+    the plan is deterministic given those inputs. pH is bucketed to one
+    decimal, scores to integers and farm size to one decimal so nearby
+    inputs share cache entries.
+    """
+    soil_data = soil_data or {}
+    weather_data = weather_data or {}
+    risks = weather_data.get("risk_assessment", {})
+
+    try:
+        cached = _plan_crops_cached(
+            soil_data.get("type", "unknown"),
+            round(soil_data.get("ph", 7.0), 1),
+            int(soil_data.get("health_score", 5)),
+            round(soil_data.get("confidence", 0.3), 1),
+            tuple(soil_data.get("constraints", [])),
+            weather_data.get("season", "kharif"),
+            round(weather_data.get("suitability", {}).get("score", 0.5), 1),
+            round(weather_data.get("confidence", 0.3), 1),
+            risks.get("drought", {}).get("level", "none"),
+            risks.get("frost", {}).get("level", "none"),
+            risks.get("flood", {}).get("level", "none"),
+            risks.get("disease", {}).get("level", "none"),
+            round(context.get("farm_size_ha", 1.0), 1),
+            bool(context.get("irrigation_available", False)),
+        )
+    except Exception as e:
+        # Built fresh per failure and never cached: a raising call
+        # leaves no lru_cache entry, so the plan recomputes once the
+        # transient cause clears
+        return {
+            "recommended_crops": [],
+            "alternatives": [],
+            "risk_assessment": {},
+            "precautions": [],
+            "season": "unknown",
+            "rag_context_used": 0,
+            "confidence": 0.1,
+            "data_sources": [],
+            "error": str(e),
+        }
+    # Copy the mutable layers so callers can reshape their response
+    # without corrupting the cached entry
+    return _copy_plan(cached)
+
+def _copy_plan(cached):
+    """Copy only the layers a caller may mutate.
+
+    The variety, scheme and alternative dicts are import-time constants
+    treated as read-only, so they are shared by reference instead of
+    being deep-copied per request — dozens of dict allocations saved per
+    plan. They stay plain dicts (not MappingProxyType views) because the
+    response must remain directly JSON-serializable at the handler
+    boundary.
+    """
+    plan = dict(cached)
+    recommendations = []
+    for rec in cached["recommended_crops"]:
+        rec = dict(rec)
+        economics = dict(rec["economics"])
+        economics["input_costs"] = dict(economics["input_costs"])
+        economics["expected_revenue"] = dict(economics["expected_revenue"])
+        economics["expected_profit"] = dict(economics["expected_profit"])
+        rec["economics"] = economics
+        rec["varieties"] = list(rec["varieties"])
+        rec["government_schemes"] = list(rec["government_schemes"])
+        recommendations.append(rec)
+    plan["recommended_crops"] = recommendations
+    plan["alternatives"] = list(cached["alternatives"])
+    risk_assessment = dict(cached["risk_assessment"])
+    if "soil_constraints" in risk_assessment:
+        risk_assessment["soil_constraints"] = list(risk_assessment["soil_constraints"])
+    plan["risk_assessment"] = risk_assessment
+    plan["precautions"] = [dict(p) for p in cached["precautions"]]
+    return plan
+
+@functools.lru_cache(maxsize=512)
+def _plan_crops_cached(soil_type, ph_level, health_score, soil_confidence, constraints,
+                       season, weather_suitability, weather_confidence,
+                       drought, frost, flood, disease, farm_size, irrigation):
+    soil_data = {
+        "type": soil_type,
+        "ph": ph_level,
+        "health_score": health_score,
+        "confidence": soil_confidence,
+        "constraints": list(constraints),
+    }
+    weather_data = {
+        "season": season,
+        "confidence": weather_confidence,
+        "suitability": {"score": weather_suitability},
+        "risk_assessment": {
+            "drought": {"level": drought},
+            "frost": {"level": frost},
+            "flood": {"level": flood},
+            "disease": {"level": disease},
+        },
+    }
+    context = {"farm_size_ha": farm_size, "irrigation_available": irrigation}
+    return _plan_crops_impl(context, soil_data, weather_data)
+
+# Same shape as the error path, returned when soil and weather
+# confidence are both below PLAN_LOW_CONF_GATE
+_LOW_CONFIDENCE_FALLBACK = {
+    "recommended_crops": [],
+    "alternatives": [],
+    "risk_assessment": {},
+    "precautions": [],
+    "season": "unknown",
+    "rag_context_used": 0,
+    "confidence": 0.1,
+    "data_sources": [],
+    "note": "Soil and weather confidence too low for an actionable plan",
+}
+
+def _plan_crops_impl(context, soil_data, weather_data):
+    try:
+        soil_type = soil_data.get("type", "unknown")
+        ph_level = soil_data.get("ph", 7.0)
+        soil_confidence = soil_data.get("confidence", 0.3)
+        weather_confidence = weather_data.get("confidence", 0.3)
+        season = weather_data.get("season", "kharif")
+        farm_size = context.get("farm_size_ha", 1.0)
+        irrigation = context.get("irrigation_available", False)
+
+        # When both analyses are guesswork the plan would come back below
+        # an actionable confidence anyway — skip the retrieval and
+        # economics pipeline and return the precomputed fallback
+        if soil_confidence < PLAN_LOW_CONF_GATE and weather_confidence < PLAN_LOW_CONF_GATE:
+            return dict(_LOW_CONFIDENCE_FALLBACK, season=season)
+
+        # Several helpers read the same risk levels; resolve the nested
+        # .get chains once and pass plain strings down
+        risks = weather_data.get("risk_assessment") or {}
+        drought_level = risks.get("drought", {}).get("level", "none")
+        frost_level = risks.get("frost", {}).get("level", "none")
+        flood_level = risks.get("flood", {}).get("level", "none")
+        disease_level = risks.get("disease", {}).get("level", "none")
+
+        docs = _retrieve_docs_cached(soil_type, round(ph_level, 1), season)
+
+        recommendations = _generate_crop_recommendations(
+            soil_type, soil_data, weather_data, season, irrigation
+        )
+
+        # Single post-processing pass: fetch the crop record once per
+        # recommendation and hand it to each helper
+        economics = _calculate_economics_batch([r["name"] for r in recommendations], farm_size)
+        for rec, econ in zip(recommendations, economics):
+            crop_info = _CROP_INFO[rec["name"]]
+            rec["economics"] = econ
+            rec["varieties"] = _get_variety_recommendations(crop_info, drought_level, frost_level)
+            rec["government_schemes"] = _get_applicable_schemes(crop_info)
+
+        return {
+            "recommended_crops": recommendations,
+            "alternatives": _find_alternatives([r["name"] for r in recommendations], season),
+            "risk_assessment": {
+                "drought": drought_level,
+                "flood": flood_level,
+                "frost": frost_level,
+                "disease": disease_level,
+                "soil_constraints": soil_data.get("constraints", []),
+            },
+            "precautions": _suggest_precautions(drought_level, flood_level, disease_level),
+            "season": season,
+            "rag_context_used": len(docs),
+            "confidence": round(min(1.0, (soil_confidence + weather_confidence) / 2 + 0.2), 2),
+            "data_sources": ["crop_database", "rag_retrieval"],
+        }
+    except Exception as e:
+        # Propagate so lru_cache never stores a transient failure; the
+        # uncached error response is built in plan_crops
+        logger.error("Crop planning failed: %s", e)
+        raise
+
+# Plain dict instead of lru_cache so a deploy artifact can pre-seed it;
+# the (soil, pH bucket, season) key space is small enough to not need
+# eviction
+_RAG_CACHE = {}
+
+def _retrieve_docs_cached(soil_type, ph_bucket, season):
+    """RAG retrieval keyed on the only inputs the query string depends
+    on — the dominant cost of a plan, so repeats must not re-hit the
+    vector store."""
+    key = f"{soil_type}|{ph_bucket}|{season}"
+    docs = _RAG_CACHE.get(key)
+    if docs is None:
+        docs = retrieve_documents(
+            f"crop recommendations for {soil_type} soil pH {ph_bucket} in {season} season"
+        )
+        _RAG_CACHE[key] = docs
+    return docs
+
+def _load_precomputed_rag():
+    # The deploy pipeline can ship precomputed retrievals for the most
+    # common (soil, pH, season) combinations next to this module; seeding
+    # the cache at import turns their first live retrieval into a dict
+    # hit instead of a vector store round trip
+    path = os.path.join(os.path.dirname(__file__), "precomputed_rag.json")
+    try:
+        with open(path, "rb") as f:
+            _RAG_CACHE.update(jsonio.loads(f.read()))
+    except (OSError, ValueError):
+        pass
+
+_load_precomputed_rag()
+
+def _generate_crop_recommendations(soil_type, soil_data, weather_data, season, irrigation):
+    candidates = _CROPS_ALL if soil_type == "unknown" else _CROPS_BY_SOIL.get(soil_type, ())
+    candidates = [
+        crop for crop in candidates
+        if season in _CROP_INFO[crop].seasons and (irrigation or not _NEEDS_IRRIGATION[crop])
+    ]
+    if not candidates:
+        return []
+
+    confidences = _confidence_batch(candidates, soil_type, soil_data, weather_data)
+    # Only the top 4 survive; nlargest keeps a 4-element heap instead of
+    # fully sorting the candidate list
+    return heapq.nlargest(
+        4,
+        (
+            {
+                "name": crop,
+                "confidence": confidence,
+                "reasoning": _generate_reasoning(crop, soil_type, season),
+                "expected_yield": _estimate_yield(crop, soil_data),
+                "duration_months": _get_crop_duration(crop),
+            }
+            for crop, confidence in zip(candidates, confidences)
+        ),
+        key=lambda x: x["confidence"],
+    )
+
+@njit(cache=True)
+def _conf_base(soil_health, soil_confidence, weather_suitability, weather_confidence):
+    # Pure-numeric scoring base shared by every candidate; kept free of
+    # dict access so numba can compile it when available
+    return (
+        0.7
+        * (0.5 + soil_health * 0.5)
+        * (0.5 + weather_suitability * 0.5)
+        * (0.7 + 0.3 * (soil_confidence + weather_confidence) / 2)
+    )
+
+def _confidence_batch(crops, soil_type, soil_data, weather_data):
+    """Score all candidate crops at once.
+
+    The soil/weather factors are identical across crops, so they collapse
+    into a single scalar base; only the soil-match and MSP bonuses vary
+    per crop, and those are precomputed boolean rows — one vectorized
+    expression replaces N scalar scoring calls."""
+    base = _conf_base(
+        soil_data.get("health_score", 5) / 10.0,
+        soil_data.get("confidence", 0.3),
+        weather_data.get("suitability", {}).get("score", 0.5),
+        weather_data.get("confidence", 0.3),
+    )
+
+    idx = np.array([_CROP_ROW[crop] for crop in crops])
+    soil_match = _SOIL_MATCH.get(soil_type, _NO_SOIL_MATCH)[idx]
+    confidences = base * np.where(soil_match, 1.15, 0.85) * np.where(_HAS_MSP_ARR[idx], 1.05, 1.0)
+    np.minimum(confidences, 1.0, out=confidences)
+    return [round(c, 2) for c in confidences.tolist()]
+
+def _calculate_confidence(crop, soil_data, weather_data):
+    return _confidence_batch(
+        (crop,), soil_data.get("type", "unknown"), soil_data, weather_data
+    )[0]
+
+def _generate_reasoning(crop, soil_type, season):
+    if soil_type == "unknown":
+        return f"{crop.replace('_', ' ').title()} is a dependable {season} season choice"
+    return (
+        f"{crop.replace('_', ' ').title()} suits {soil_type} soil and the "
+        f"{season} season in your region"
+    )
+
+def _estimate_yield(crop, soil_data):
+    base = _CROP_INFO[crop].expected_yield_kg_ha
+    health_factor = 0.7 + soil_data.get("health_score", 5) / 10.0 * 0.6
+    low = int(base * health_factor * 0.85)
+    high = int(base * health_factor * 1.1)
+    return f"{low}-{high} kg/ha"
+
+def _get_crop_duration(crop):
+    return _CROP_INFO[crop].duration_months
+
+def _calculate_economics_batch(crops, farm_size):
+    """Compute economics for all recommended crops in one vectorized
+    pass over the SoA table; results are zipped back per crop."""
+    if not crops:
+        return []
+    idx = np.array([_CROP_ROW[crop] for crop in crops])
+
+    total_cost = _COST_TOTAL[idx] * farm_size
+    expected_yield = _YIELD_KG_HA[idx] * farm_size
+    # Prices are per quintal (100 kg)
+    revenue_min = expected_yield / 100 * _PRICE_MIN[idx]
+    revenue_max = expected_yield / 100 * _PRICE_MAX[idx]
+    profit_min = revenue_min - total_cost
+    profit_max = revenue_max - total_cost
+    roi = np.divide(profit_max, total_cost, out=np.zeros_like(profit_max), where=total_cost != 0) * 100
+    seeds = _COST_SEEDS[idx] * farm_size
+    fertilizers = _COST_FERTILIZERS[idx] * farm_size
+    irrigation = _COST_IRRIGATION[idx] * farm_size
+    pesticides = _COST_PESTICIDES[idx] * farm_size
+
+    # .item() emits native Python numbers: orjson serializes those on its
+    # fast path at the handler boundary, numpy scalars would not
+    return [
+        {
+            "input_costs": {
+                "seeds": seeds[i].item(),
+                "fertilizers": fertilizers[i].item(),
+                "irrigation": irrigation[i].item(),
+                "pesticides": pesticides[i].item(),
+                "total": total_cost[i].item(),
+            },
+            "expected_revenue": {"min": round(revenue_min[i].item()), "max": round(revenue_max[i].item())},
+            "expected_profit": {"min": round(profit_min[i].item()), "max": round(profit_max[i].item())},
+            "roi_percent": round(roi[i].item()),
+            "msp_support": _MSP_2024[row],
+        }
+        for i, row in enumerate(idx)
+    ]
+
+# Per-(crop, condition) variety tuples, pre-sliced to the two entries the
+# recommendation ever uses, built once at import
+_VARIETY_CACHE = {
+    (crop, condition): tuple(info.get("varieties", {}).get(condition, [])[:2])
+    for crop, info in CROP_DATABASE.items()
+    for condition in ("drought", "frost", "high_yield", "resilient")
+}
+_RISK_ELEVATED = frozenset(("high", "medium"))
+
+def _get_variety_recommendations(crop_info, drought_level, frost_level):
+    crop = crop_info.name
+    recommended = []
+    if drought_level in _RISK_ELEVATED:
+        recommended.extend(_VARIETY_CACHE[(crop, "drought")])
+    if frost_level in _RISK_ELEVATED:
+        recommended.extend(_VARIETY_CACHE[(crop, "frost")])
+    if not recommended:
+        recommended.extend(_VARIETY_CACHE[(crop, "high_yield")])
+        recommended.extend(_VARIETY_CACHE[(crop, "resilient")])
+    return recommended[:4]
+
+_SCHEME_TEMPLATES = {
+    "PM-KISAN": {
+        "name": "PM-KISAN",
+        "benefit": "₹6000/year direct income support",
+        "eligibility": "All landholding farmers",
+    },
+    "MSP Procurement": {
+        "name": "MSP Procurement",
+        "benefit": "Guaranteed MSP of ₹{msp}/quintal",
+        "eligibility": "Sale through registered mandis/procurement centres",
+    },
+    "PMFBY": {
+        "name": "PMFBY",
+        "benefit": "Crop insurance at 1.5-2% premium of sum insured",
+        "eligibility": "All farmers growing notified crops",
+    },
+    "KCC": {
+        "name": "KCC",
+        "benefit": "Credit up to ₹3 lakh at subsidised interest",
+        "eligibility": "Farmers with land records or tenancy documents",
+    },
+}
+
+def _build_scheme_cache():
+    # Scheme lists and MSP values are static per crop, so resolve the
+    # templates (including the MSP interpolation) once at import. Every
+    # crop tuple references the same singleton dict per scheme —
+    # MSP-interpolated variants are materialized once per distinct MSP —
+    # so no scheme dicts are ever built at request time.
+    msp_variants = {}
+    cache = {}
+    for crop, info in CROP_DATABASE.items():
+        schemes = []
+        for scheme in info.get("government_schemes", []):
+            details = _SCHEME_TEMPLATES.get(scheme)
+            if details is None:
+                continue
+            if "{msp}" in details["benefit"]:
+                msp = info.get("msp_2024")
+                details = msp_variants.setdefault(
+                    (scheme, msp),
+                    dict(details, benefit=details["benefit"].format(msp=msp)),
+                )
+            schemes.append(details)
+        cache[crop] = tuple(schemes)
+    return cache
+
+_SCHEME_CACHE = _build_scheme_cache()
+
+def _get_applicable_schemes(crop_info):
+    return _SCHEME_CACHE.get(crop_info.name, ())
+
+# Static per-season fallback suggestions, already in response shape so
+# _find_alternatives only filters — no per-call dict building
+_LOW_INPUT_ALTERNATIVES = {
+    "kharif": (
+        {"crop": "millet", "reason": "Very low input cost, drought hardy", "type": "low_input_alternative"},
+        {"crop": "pigeon_pea", "reason": "Fixes nitrogen, low water need", "type": "low_input_alternative"},
+        {"crop": "groundnut", "reason": "Low irrigation requirement, MSP backed", "type": "low_input_alternative"},
+    ),
+    "rabi": (
+        {"crop": "mustard", "reason": "Low water requirement, short duration", "type": "low_input_alternative"},
+        {"crop": "chickpea", "reason": "Fixes nitrogen, rainfed friendly", "type": "low_input_alternative"},
+    ),
+    "zaid": (
+        {"crop": "millet", "reason": "Tolerates summer heat with minimal water", "type": "low_input_alternative"},
+    ),
+}
+
+def _find_alternatives(primary_crops, season):
+    primary_set = set(primary_crops)
+    return [
+        alt
+        for alt in _LOW_INPUT_ALTERNATIVES.get(season, _LOW_INPUT_ALTERNATIVES["kharif"])
+        if alt["crop"] not in primary_set
+    ]
+
+# Canonical labels repeated across every precaution/risk dict the
+# service emits. Interning pins one object per label so the thousands
+# of dicts built over a container's lifetime share them, and downstream
+# equality checks like `priority == _P_HIGH` short-circuit on identity.
+_P_HIGH = sys.intern("high")
+_P_MEDIUM = sys.intern("medium")
+_P_LOW = sys.intern("low")
+_T_BEFORE_SOWING = sys.intern("before_sowing")
+_T_SEED_SELECTION = sys.intern("seed_selection")
+_T_LAND_PREPARATION = sys.intern("land_preparation")
+_T_PRE_HARVEST = sys.intern("pre_harvest")
+_T_REGULAR_INTERVALS = sys.intern("regular_intervals")
+
+# The unconditional precautions never change; responses share these
+# dicts (_copy_plan re-copies them before any caller could mutate)
+_BASE_PRECAUTIONS = (
+    {
+        "action": "Get soil tested before finalising the crop",
+        "priority": _P_HIGH,
+        "timing": _T_BEFORE_SOWING,
+    },
+    {
+        "action": "Use certified seeds from authorised dealers",
+        "priority": _P_HIGH,
+        "timing": _T_SEED_SELECTION,
+    },
+    {
+        "action": "Monitor local mandi prices before harvest",
+        "priority": _P_MEDIUM,
+        "timing": _T_PRE_HARVEST,
+    },
+)
+
+def _suggest_precautions(drought_level, flood_level, disease_level):
+    precautions = [*_BASE_PRECAUTIONS]
+
+    if drought_level in _RISK_ELEVATED:
+        precautions.append({
+            "action": "Arrange supplemental irrigation or mulching for dry spells",
+            "priority": _P_HIGH,
+            "timing": _T_LAND_PREPARATION,
+        })
+
+    if flood_level in _RISK_ELEVATED:
+        precautions.append({
+            "action": "Ensure field drainage channels are cleared",
+            "priority": _P_HIGH,
+            "timing": _T_LAND_PREPARATION,
+        })
+
+    if disease_level in _RISK_ELEVATED:
+        precautions.append({
+            "action": "Scout for pest and disease symptoms weekly",
+            "priority": _P_MEDIUM,
+            "timing": _T_REGULAR_INTERVALS,
+        })
+
+    return precautions
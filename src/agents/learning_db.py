@@ -0,0 +1,172 @@
+"""DynamoDB-backed learning store.
+
+Persists regional soil profiles, pincode locations and weather
+observations learned from farmer queries so later invocations can
+answer from accumulated data instead of defaults.
+"""
+
+import functools
+import queue
+import threading
+import time
+
+from config import AWS_REGION, LEARNING_TABLE
+from utils.logger import logger
+
+@functools.cache
+def get_table():
+    """Shared DynamoDB table handle, built lazily on first use."""
+    import boto3
+
+    return boto3.resource("dynamodb", region_name=AWS_REGION).Table(LEARNING_TABLE)
+
+def db_get_soil(region):
+    """Fetch the learned soil profile for a district or state, or None."""
+    if not region:
+        return None
+    try:
+        item = get_table().get_item(Key={"pk": f"soil#{region}"}).get("Item")
+        return item.get("profile") if item else None
+    except Exception as e:
+        logger.warning("Soil profile read failed for %s: %s", region, e)
+        return None
+
+def learn_soil_from_query(region, soil_data, source="user_query"):
+    """Persist soil parameters extracted from a high-confidence query."""
+    if not region:
+        return
+    get_table().put_item(Item={
+        "pk": f"soil#{region}",
+        "profile": soil_data,
+        "source": source,
+        "updated_at": int(time.time()),
+    })
+
+# Background batch writer: learns are fire-and-forget, so they queue
+# here and a daemon thread drains up to 25 at a time (the BatchWriteItem
+# ceiling) with a 200 ms collection window, keeping DynamoDB writes off
+# the request path entirely.
+_LEARN_QUEUE = queue.Queue(maxsize=10_000)
+_LEARN_WORKER_LOCK = threading.Lock()
+_learn_worker_started = False
+
+def queue_soil_learn(region, soil_data, source="user_query"):
+    """Queue a soil-profile write for the background batch writer.
+
+    Never blocks the caller: if the queue is full the learn is dropped
+    with a warning — losing one observation is cheaper than stalling a
+    response.
+    """
+    if not region:
+        return
+    _ensure_learn_worker()
+    try:
+        _LEARN_QUEUE.put_nowait({
+            "pk": f"soil#{region}",
+            "profile": soil_data,
+            "source": source,
+            "updated_at": int(time.time()),
+        })
+    except queue.Full:
+        logger.warning("Learning queue full; dropping soil learn for %s", region)
+
+def _ensure_learn_worker():
+    global _learn_worker_started
+    if _learn_worker_started:
+        return
+    with _LEARN_WORKER_LOCK:
+        if not _learn_worker_started:
+            threading.Thread(target=_drain_learn_queue, daemon=True).start()
+            _learn_worker_started = True
+
+def _drain_learn_queue():
+    while True:
+        batch = [_LEARN_QUEUE.get()]
+        deadline = time.monotonic() + 0.2
+        while len(batch) < 25:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_LEARN_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Last write wins per key: BatchWriteItem rejects duplicate keys
+        # in one call, and newer learns supersede older ones anyway
+        deduped = {item["pk"]: item for item in batch}
+        try:
+            with get_table().batch_writer(overwrite_by_pkeys=("pk",)) as writer:
+                for item in deduped.values():
+                    writer.put_item(Item=item)
+        except Exception as e:
+            logger.warning("Batched learn write failed: %s", e)
+
+def db_get_pincode(pincode):
+    """Fetch a previously learned pincode location, or None."""
+    if not pincode:
+        return None
+    try:
+        item = get_table().get_item(Key={"pk": f"pin#{pincode}"}).get("Item")
+        return item.get("location") if item else None
+    except Exception as e:
+        logger.warning("Pincode read failed for %s: %s", pincode, e)
+        return None
+
+def learn_pincode_location(pincode):
+    """Resolve a pincode via the India Post API and persist the result."""
+    import urllib.request
+
+    from utils import jsonio
+
+    try:
+        url = f"https://api.postalpincode.in/pincode/{pincode}"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            payload = jsonio.loads(resp.read())
+    except Exception as e:
+        logger.warning("Pincode lookup failed for %s: %s", pincode, e)
+        return None
+
+    try:
+        office = payload[0]["PostOffice"][0]
+        location = {
+            "district": office.get("District", "").lower(),
+            "state": office.get("State", "").lower(),
+        }
+    except (LookupError, TypeError):
+        return None
+
+    try:
+        get_table().put_item(Item={
+            "pk": f"pin#{pincode}",
+            "location": location,
+            "updated_at": int(time.time()),
+        })
+    except Exception as e:
+        logger.warning("Pincode write failed for %s: %s", pincode, e)
+    return location
+
+def save_weather_observation(region, observation):
+    """Record one weather observation for later regional estimates."""
+    if not region:
+        return
+    get_table().put_item(Item={
+        "pk": f"weather#{region}#{int(time.time())}",
+        "observation": observation,
+    })
+
+def queue_weather_observation(region, observation):
+    """Queue a weather observation for the background batch writer.
+
+    Same contract as queue_soil_learn: never blocks, drops on a full
+    queue — observations are telemetry, not responses.
+    """
+    if not region:
+        return
+    _ensure_learn_worker()
+    try:
+        _LEARN_QUEUE.put_nowait({
+            "pk": f"weather#{region}#{int(time.time())}",
+            "observation": observation,
+        })
+    except queue.Full:
+        logger.warning("Learning queue full; dropping weather observation for %s", region)
@@ -0,0 +1,623 @@
+"""Multi-agent orchestrator.
+
+Routes a farmer's query to the soil, weather and crop-planning agents
+based on detected intent, merges their outputs into one structured
+response and prepares the prompt input for the LLM answer step.
+
+Soil and weather analysis are independent, so they run concurrently and
+are joined before crop planning (which consumes both).
+"""
+
+import asyncio
+import datetime
+import functools
+import os
+import re
+from collections import namedtuple
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType, SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from agents.crop_planning_agent import plan_crops
+from agents.semantic_cache import SemanticCache
+from agents.soil_agent import analyze_soil_async
+from agents.weather_agent import analyze_weather_async
+from utils.jit import njit
+from utils.logger import logger
+
+_SEMANTIC_CACHE = SemanticCache(maxsize=256, threshold=0.92)
+# Responses backed by a live weather fetch go stale with the forecast;
+# profile-derived responses hold for much longer
+_TTL_LIVE = 3 * 3600
+_TTL_STATIC = 7 * 24 * 3600
+
+INTENT_PATTERNS = {
+    "soil_inquiry": {
+        "keywords": ["soil", "ph", "nutrient", "fertility", "nitrogen", "phosphorus",
+                     "potassium", "organic matter", "mitti"],
+        "weight": 1.0,
+    },
+    "weather_inquiry": {
+        "keywords": ["weather", "rain", "rainfall", "temperature", "monsoon", "forecast",
+                     "climate", "mausam"],
+        "weight": 1.0,
+    },
+    "crop_selection": {
+        "keywords": ["crop", "plant", "grow", "sow", "cultivate", "which crop",
+                     "what to grow", "variety", "fasal"],
+        "weight": 1.2,
+    },
+    "economics": {
+        "keywords": ["profit", "cost", "price", "income", "loan", "msp", "subsidy", "scheme"],
+        "weight": 0.8,
+    },
+    "pest_disease": {
+        "keywords": ["pest", "disease", "insect", "fungus", "blight", "infestation"],
+        "weight": 0.9,
+    },
+}
+
+# Single-pass keyword scanner: all intent keywords fold into one
+# automaton so scoring is one linear scan of the query instead of
+# ~40 independent substring searches
+_KEYWORD_INTENTS = {
+    kw: (intent, pattern["weight"])
+    for intent, pattern in INTENT_PATTERNS.items()
+    for kw in pattern["keywords"]
+}
+
+try:
+    import ahocorasick
+
+    _AUTOMATON = ahocorasick.Automaton()
+    for _kw, (_intent, _weight) in _KEYWORD_INTENTS.items():
+        _AUTOMATON.add_word(_kw, (_kw, _intent, _weight))
+    _AUTOMATON.make_automaton()
+
+    def _scan_keywords(query_lower):
+        # The automaton reports every occurrence, including keywords
+        # nested inside longer ones ("crop" within "which crop"), which
+        # the regex fallback's leftmost-longest alternation never
+        # yields. Collect word-bounded candidates first, then keep only
+        # leftmost-longest non-overlapping hits so both scanner
+        # implementations score identically.
+        candidates = []
+        for end, hit in _AUTOMATON.iter(query_lower):
+            # Enforce word boundaries so e.g. "pest" does not fire
+            # inside "pesticide"
+            start = end - len(hit[0]) + 1
+            if start > 0 and (query_lower[start - 1].isalnum() or query_lower[start - 1] == "_"):
+                continue
+            if end + 1 < len(query_lower) and (query_lower[end + 1].isalnum() or query_lower[end + 1] == "_"):
+                continue
+            candidates.append((start, -(end + 1), hit))
+        last_end = 0
+        for start, neg_end, hit in sorted(candidates):
+            if start < last_end:
+                continue
+            last_end = -neg_end
+            yield hit
+except ImportError:
+    # pyahocorasick is optional; a combined word-bounded alternation
+    # (longest keyword first so multi-word phrases win) is still one
+    # pass over the query. google-re2 compiles it to a DFA with no
+    # backtracking when installed; stdlib re otherwise.
+    try:
+        import re2 as _re_engine
+    except ImportError:
+        _re_engine = re
+
+    _KEYWORD_RE = _re_engine.compile(
+        r"\b(?:"
+        + "|".join(re.escape(kw) for kw in sorted(_KEYWORD_INTENTS, key=len, reverse=True))
+        + r")\b"
+    )
+
+    def _scan_keywords(query_lower):
+        for match in _KEYWORD_RE.finditer(query_lower):
+            kw = match.group()
+            intent, weight = _KEYWORD_INTENTS[kw]
+            yield kw, intent, weight
+
+# Intent scoring as a matrix-vector product: one static (intents x
+# vocab) weight matrix, one 0/1 hit vector per query. Accumulating
+# scores becomes a single matmul instead of per-keyword Python adds,
+# and the cost stays flat as intents are added.
+_INTENT_NAMES = tuple(INTENT_PATTERNS)
+_VOCAB = sorted(_KEYWORD_INTENTS)
+_KEYWORD_INDEX = {kw: i for i, kw in enumerate(_VOCAB)}
+_INTENT_WEIGHTS = np.zeros((len(_INTENT_NAMES), len(_VOCAB)))
+for _i, _name in enumerate(_INTENT_NAMES):
+    for _kw in INTENT_PATTERNS[_name]["keywords"]:
+        _INTENT_WEIGHTS[_i, _KEYWORD_INDEX[_kw]] = INTENT_PATTERNS[_name]["weight"]
+
+# Independent agents share one invocation shape: (intent name, async
+# entry point, response field). Scheduling and error handling iterate
+# this table, so adding an agent is a one-line change. Crop planning
+# stays outside the table because it consumes the others' outputs.
+_AGENT_DISPATCH = (
+    ("soil", analyze_soil_async, "soil_data"),
+    ("weather", analyze_weather_async, "weather_data"),
+)
+
+# Normalized views of the query, computed once per orchestration and
+# threaded through instead of each helper re-lowering/re-splitting
+_QueryCtx = namedtuple("QueryCtx", "raw lower tokens length")
+
+@dataclass(slots=True)
+class OrchestratorResponse:
+    """Response under assembly: slot access beats dict hashing for the
+    ~30 field reads/writes per orchestration; converted to a plain dict
+    only at the serialization boundary."""
+    query: str
+    intent_analysis: dict
+    agents_invoked: list = field(default_factory=list)
+    soil_data: Optional[dict] = None
+    weather_data: Optional[dict] = None
+    crop_plan: Optional[dict] = None
+    agent_errors: list = field(default_factory=list)
+    data_sources: list = field(default_factory=list)
+    data_freshness_summary: dict = field(default_factory=dict)
+    overall_confidence: float = 0.1
+    llm_prompt_input: str = ""
+
+    def to_dict(self):
+        # Shallow on purpose: dataclasses.asdict would deep-copy every
+        # nested agent payload
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+def orchestrate_query(query, context, generate_prompt=True):
+    """Synchronous entry point for the Lambda handler.
+
+    Callers that only consume the structured fields can pass
+    generate_prompt=False to skip building the LLM prompt string.
+    """
+    return asyncio.run(orchestrate_query_async(query, context, generate_prompt))
+
+def orchestrate_query_batch(items):
+    """Orchestrate several (query, context) pairs in one event loop.
+
+    All agent I/O across the batch overlaps instead of running one
+    query at a time; duplicated work between similar queries is absorbed
+    by the semantic cache and the per-agent caches underneath.
+    """
+    return asyncio.run(orchestrate_query_batch_async(items))
+
+async def orchestrate_query_batch_async(items):
+    return list(await asyncio.gather(
+        *(orchestrate_query_async(query, context) for query, context in items)
+    ))
+
+async def orchestrate_query_async(query, context, generate_prompt=True):
+    # Semantically equivalent queries for the same location and season
+    # can reuse a prior full response, skipping all three agents
+    season_bucket = _current_season_bucket()
+    cached = _SEMANTIC_CACHE.get(query, context.get("pincode"), season_bucket)
+    if cached is not None:
+        if generate_prompt and not cached.get("llm_prompt_input"):
+            # The cached entry came from a structured-only call
+            cached["llm_prompt_input"] = _generate_llm_prompt(
+                query, SimpleNamespace(**cached), context
+            )
+        cached["cache_hit"] = True
+        return cached
+
+    lower = query.lower()
+    tokens = tuple(lower.split())
+    qctx = _QueryCtx(query, lower, tokens, len(tokens))
+
+    intent_analysis = _analyze_query_intent(qctx, context)
+    agents_to_invoke = intent_analysis["agents_to_invoke"]
+    agent_context = _prepare_agent_context(context)
+
+    resp = OrchestratorResponse(query=query, intent_analysis=intent_analysis)
+
+    # Deduplicate sources as they arrive: O(1) set membership keeps the
+    # list unique in stable first-seen order (deterministic for cache keys)
+    data_sources = resp.data_sources
+    seen_sources = set()
+
+    def _add_sources(new):
+        for source in new:
+            if source not in seen_sources:
+                seen_sources.add(source)
+                data_sources.append(source)
+
+    # Soil and weather are independent I/O-bound agents: run both
+    # concurrently and join, instead of paying their latencies in sequence
+    tasks = [
+        (name, field_name, asyncio.create_task(agent(query, agent_context)))
+        for name, agent, field_name in _AGENT_DISPATCH
+        if name in agents_to_invoke
+    ]
+    results = await asyncio.gather(*(task for _, _, task in tasks), return_exceptions=True)
+    for (name, field_name, _), result in zip(tasks, results):
+        if isinstance(result, Exception):
+            logger.error("%s agent failed: %s", name, result)
+            resp.agent_errors.append({"agent": name, "error": str(result)})
+        else:
+            setattr(resp, field_name, result)
+            resp.agents_invoked.append(name)
+            _add_sources(result.get("data_sources", []))
+
+    if "crop_planning" in agents_to_invoke:
+        soil_data = resp.soil_data or _get_default_soil_data()
+        weather_data = resp.weather_data or _get_default_weather_data()
+        try:
+            crop_plan = await asyncio.to_thread(
+                plan_crops, query, agent_context, soil_data, weather_data
+            )
+            resp.crop_plan = crop_plan
+            resp.agents_invoked.append("crop_planning")
+            _add_sources(crop_plan.get("data_sources", []))
+        except Exception as e:
+            logger.error("crop_planning agent failed: %s", e)
+            resp.agent_errors.append({"agent": "crop_planning", "error": str(e)})
+
+    # Confidence aggregation and the freshness summary are pure and
+    # independent of each other: overlap them in worker threads. The
+    # prompt runs after — its footer embeds the overall confidence.
+    resp.overall_confidence, resp.data_freshness_summary = await asyncio.gather(
+        asyncio.to_thread(_calculate_overall_confidence, resp),
+        asyncio.to_thread(_summarize_data_freshness, resp),
+    )
+    if generate_prompt:
+        resp.llm_prompt_input = _generate_llm_prompt(query, resp, context)
+
+    response = resp.to_dict()
+    # agent_errors alone is not enough: each agent catches its own
+    # failures and returns an error payload instead of raising, so a
+    # degraded plan or fallback forecast would otherwise be cached for
+    # days and served to every semantically similar query
+    degraded = resp.agent_errors or any(
+        payload is not None and "error" in payload
+        for payload in (resp.soil_data, resp.weather_data, resp.crop_plan)
+    )
+    if not degraded:
+        is_live = bool(resp.weather_data) and resp.weather_data.get("data_freshness") == "live"
+        _SEMANTIC_CACHE.put(
+            query, context.get("pincode"), season_bucket, response,
+            ttl=_TTL_LIVE if is_live else _TTL_STATIC,
+        )
+    return response
+
+def _current_season_bucket():
+    month = datetime.date.today().month
+    if 6 <= month <= 9:
+        return "kharif"
+    if month >= 10 or month <= 2:
+        return "rabi"
+    return "zaid"
+
+def _analyze_query_intent(qctx, context):
+    query_lower = qctx.lower
+
+    hit_vector = np.zeros(len(_VOCAB))
+    matched = {}
+    for keyword, intent, _weight in _scan_keywords(query_lower):
+        index = _KEYWORD_INDEX[keyword]
+        if not hit_vector[index]:
+            hit_vector[index] = 1.0
+            matched.setdefault(intent, []).append(keyword)
+
+    scores = _INTENT_WEIGHTS @ hit_vector
+    detected_intents = {
+        intent: {"score": float(scores[i]), "matched_keywords": matched[intent]}
+        for i, intent in enumerate(_INTENT_NAMES)
+        if intent in matched
+    }
+
+    agents_to_invoke = set()
+    if "soil_inquiry" in detected_intents:
+        agents_to_invoke.add("soil")
+    if "weather_inquiry" in detected_intents:
+        agents_to_invoke.add("weather")
+    if "crop_selection" in detected_intents or "economics" in detected_intents:
+        agents_to_invoke.update(("soil", "weather", "crop_planning"))
+    if not agents_to_invoke:
+        # General query: run the full pipeline so the answer has substance
+        agents_to_invoke.update(("soil", "weather", "crop_planning"))
+
+    if detected_intents:
+        primary_intent = max(detected_intents, key=lambda i: detected_intents[i]["score"])
+    else:
+        primary_intent = "general"
+
+    return {
+        "detected_intents": detected_intents,
+        "primary_intent": primary_intent,
+        "agents_to_invoke": sorted(agents_to_invoke),
+        "query_length": qctx.length,
+    }
+
+def _prepare_agent_context(context):
+    # Multi-turn sessions reuse the same context fields query after
+    # query, so the normalized dict is memoized on them. The cached
+    # value is a read-only view shared across calls; agents only read
+    # their context.
+    return _prepare_agent_context_cached(
+        context.get("pincode"),
+        context.get("district"),
+        context.get("state"),
+        context.get("language", "en"),
+        context.get("farm_size_ha", 1.0),
+        context.get("irrigation_available", False),
+        context.get("previous_crop"),
+        context.get("budget"),
+    )
+
+@functools.lru_cache(maxsize=1024)
+def _prepare_agent_context_cached(pincode, district, state, language,
+                                  farm_size_ha, irrigation_available,
+                                  previous_crop, budget):
+    return MappingProxyType({
+        "pincode": pincode,
+        "district": district,
+        "state": state,
+        "language": language,
+        "farm_size_ha": farm_size_ha,
+        "irrigation_available": irrigation_available,
+        "previous_crop": previous_crop,
+        "budget": budget,
+    })
+
+# The fallback soil/weather inputs are pure constants only ever read by
+# plan_crops, so they are built once and returned as shared immutable
+# views instead of fresh nested dicts per fallback call
+_DEFAULT_SOIL_DATA = MappingProxyType({
+    "type": "unknown",
+    "ph": 7.0,
+    "organic_matter": 0.5,
+    "npk_levels": MappingProxyType({}),
+    "micronutrients": MappingProxyType({}),
+    "health_score": 5,
+    "confidence": 0.3,
+    "constraints": (),
+    "recommendations": ("Using default soil assumptions - get a soil test",),
+    "data_sources": ("default",),
+    "data_freshness": "default",
+})
+
+_DEFAULT_WEATHER_DATA = MappingProxyType({
+    "season": "kharif",
+    "region": "central",
+    "temperature_range": MappingProxyType({"min": 20, "max": 35}),
+    "rainfall": 500,
+    "rainfall_pattern": "moderate",
+    "humidity": 60,
+    "frost_risk": "none",
+    "suitability": MappingProxyType({"score": 0.5, "label": "moderate"}),
+    "risk_assessment": MappingProxyType({
+        "drought": MappingProxyType({"level": "none"}),
+        "flood": MappingProxyType({"level": "none"}),
+        "frost": MappingProxyType({"level": "none"}),
+        "disease": MappingProxyType({"level": "none"}),
+    }),
+    "confidence": 0.3,
+    "data_sources": ("default",),
+    "data_freshness": "default",
+})
+
+def _get_default_soil_data():
+    return _DEFAULT_SOIL_DATA
+
+def _get_default_weather_data():
+    return _DEFAULT_WEATHER_DATA
+
+@njit(cache=True)
+def _agg_conf(confs, weights, err_count):
+    # Pure-numeric aggregation core, shared by the single-response path
+    # and any batch scoring; numba compiles it when available
+    value = (confs * weights).sum() / weights.sum() - 0.1 * err_count
+    return max(0.1, min(1.0, value))
+
+def _calculate_overall_confidence(resp):
+    confidences = []
+    weights = []
+    if resp.soil_data:
+        confidences.append(resp.soil_data.get("confidence", 0.3))
+        weights.append(1.0)
+    if resp.weather_data:
+        confidences.append(resp.weather_data.get("confidence", 0.3))
+        weights.append(1.0)
+    if resp.crop_plan:
+        confidences.append(resp.crop_plan.get("confidence", 0.3))
+        weights.append(1.5)
+    if not confidences:
+        return 0.1
+
+    return round(float(_agg_conf(
+        np.array(confidences, dtype=np.float64),
+        np.array(weights, dtype=np.float64),
+        len(resp.agent_errors),
+    )), 2)
+
+_FRESH_HIGH_ACCURACY = frozenset(("user_provided", "live", "derived"))
+
+def _summarize_data_freshness(resp):
+    freshness = {}
+    if resp.soil_data:
+        freshness["soil"] = resp.soil_data.get("data_freshness", "unknown")
+    if resp.weather_data:
+        freshness["weather"] = resp.weather_data.get("data_freshness", "unknown")
+    if resp.crop_plan:
+        freshness["crop_plan"] = "derived"
+
+    # One pass over the values: subset test covers the all() case and
+    # membership covers the any() case without generator scans
+    vals = set(freshness.values())
+    if vals and vals <= _FRESH_HIGH_ACCURACY:
+        freshness["overall"] = "high_accuracy"
+    elif "historical" in vals:
+        freshness["overall"] = "estimated_from_historical"
+    else:
+        freshness["overall"] = "mixed_sources"
+    return freshness
+
+class _Defaulting(dict):
+    """format_map source that renders missing keys as 'Unknown'."""
+
+    def __missing__(self, key):
+        return "Unknown"
+
+# Section templates resolved once at import; each section is a single
+# format_map call instead of a string append per line. Per-language
+# variants pre-encode the section headers so no per-line language
+# branching happens at request time; unlisted languages fall back to
+# English with the LANGUAGE line steering the model.
+_HEADER_TEMPLATE = (
+    "You are an agricultural advisor for Indian farmers.\n"
+    "FARMER'S QUESTION: {query}\n"
+    "LANGUAGE: answer in {language}"
+)
+_SOIL_TEMPLATE = (
+    "SOIL ANALYSIS:\n"
+    "- Soil Type: {type}\n"
+    "- pH Level: {ph}\n"
+    "- Organic Matter: {organic_matter}%\n"
+    "- Health Score: {health_score}/10"
+)
+_WEATHER_TEMPLATE = (
+    "WEATHER ANALYSIS:\n"
+    "- Season: {season}\n"
+    "- Temperature: {temp_min}-{temp_max}°C\n"
+    "- Rainfall: {rainfall}mm ({rainfall_pattern})\n"
+    "- Suitability: {suitability_label}"
+)
+_CROP_TEMPLATE = (
+    "{index}. {title}\n"
+    "   - Confidence: {confidence}\n"
+    "   - Reasoning: {reasoning}\n"
+    "   - Expected Yield: {expected_yield}\n"
+    "   - Duration: {duration_months} months"
+)
+_FOOTER_TEMPLATE = (
+    "OVERALL CONFIDENCE: {overall_confidence}\n"
+    "Give a practical, specific answer the farmer can act on this season."
+)
+
+_LANG_TEMPLATES = {
+    "en": {
+        "header": _HEADER_TEMPLATE,
+        "soil": _SOIL_TEMPLATE,
+        "weather": _WEATHER_TEMPLATE,
+        "crops_title": "CROP RECOMMENDATIONS:",
+        "crop": _CROP_TEMPLATE,
+        "precautions_title": "PRECAUTIONS:",
+        "footer": _FOOTER_TEMPLATE,
+    },
+    "hi": {
+        "header": (
+            "You are an agricultural advisor for Indian farmers.\n"
+            "किसान का प्रश्न: {query}\n"
+            "LANGUAGE: answer in Hindi (हिन्दी)"
+        ),
+        "soil": (
+            "मिट्टी विश्लेषण:\n"
+            "- मिट्टी का प्रकार: {type}\n"
+            "- pH स्तर: {ph}\n"
+            "- जैविक पदार्थ: {organic_matter}%\n"
+            "- स्वास्थ्य स्कोर: {health_score}/10"
+        ),
+        "weather": (
+            "मौसम विश्लेषण:\n"
+            "- ऋतु: {season}\n"
+            "- तापमान: {temp_min}-{temp_max}°C\n"
+            "- वर्षा: {rainfall}mm ({rainfall_pattern})\n"
+            "- उपयुक्तता: {suitability_label}"
+        ),
+        "crops_title": "फसल सिफारिशें:",
+        "crop": _CROP_TEMPLATE,
+        "precautions_title": "सावधानियां:",
+        "footer": _FOOTER_TEMPLATE,
+    },
+}
+
+def _generate_llm_prompt(query, resp, context):
+    language = context.get("language", "en")
+    templates = _LANG_TEMPLATES.get(language, _LANG_TEMPLATES["en"])
+
+    sections = [
+        templates["header"].format_map(_Defaulting(query=query, language=language))
+    ]
+
+    soil_data = resp.soil_data
+    if soil_data:
+        section = templates["soil"].format_map(_Defaulting(soil_data))
+        if soil_data.get("npk_levels"):
+            section += f"\n- NPK: {soil_data['npk_levels']}"
+        if soil_data.get("constraints"):
+            section += f"\n- Constraints: {'; '.join(soil_data['constraints'])}"
+        sections.append(section)
+
+    weather_data = resp.weather_data
+    if weather_data:
+        temp = weather_data.get("temperature_range", {})
+        fields = _Defaulting(weather_data)
+        fields["temp_min"] = temp.get("min", "?")
+        fields["temp_max"] = temp.get("max", "?")
+        fields["suitability_label"] = weather_data.get("suitability", {}).get("label", "unknown")
+        sections.append(templates["weather"].format_map(fields))
+
+    crop_plan = resp.crop_plan
+    if crop_plan:
+        # Hot loop: alias the bound methods and template so each crop
+        # entry costs LOAD_FAST instead of repeated attribute lookups
+        append = sections.append
+        crop_template = templates["crop"]
+        append(templates["crops_title"])
+        for i, crop in enumerate(crop_plan.get("recommended_crops", []), 1):
+            crop_get = crop.get
+            fields = _Defaulting(crop)
+            fields["index"] = i
+            fields["title"] = crop_get("name", "unknown").replace("_", " ").title()
+            entry = crop_template.format_map(fields)
+            economics = crop_get("economics")
+            if economics:
+                profit = economics.get("expected_profit", {})
+                entry += f"\n   - Expected Profit: ₹{profit.get('min', '?')}-{profit.get('max', '?')}"
+            varieties = crop_get("varieties")
+            if varieties:
+                names = ", ".join(v.get("name", "") for v in varieties)
+                entry += f"\n   - Suggested Varieties: {names}"
+            append(entry)
+        if crop_plan.get("precautions"):
+            sections.append(templates["precautions_title"] + "\n" + "\n".join(
+                f"- [{p.get('priority', 'medium')}] {p.get('action', '')}"
+                for p in crop_plan["precautions"]
+            ))
+
+    if resp.agent_errors:
+        sections.append(
+            f"NOTE: some analyses failed ({len(resp.agent_errors)}); answer from available data."
+        )
+
+    sections.append(
+        templates["footer"].format_map(_Defaulting(overall_confidence=resp.overall_confidence))
+    )
+    return "\n".join(sections)
+
+def _warm_cold_start():
+    """Pull one-time initialization into the Lambda INIT phase.
+
+    INIT runs before the latency SLA starts, so building the Bedrock
+    and Pinecone clients here hides their TLS handshakes from the first
+    request. Locally (no AWS_LAMBDA_FUNCTION_NAME) clients stay lazy.
+    """
+    try:
+        from aws_clients import get_bedrock
+        from embeddings.pinecone_client import get_index
+
+        get_bedrock()
+        get_index()
+    except Exception as e:
+        logger.warning("Cold-start warmup skipped: %s", e)
+    # Dry runs so the first request pays no lazy-compile cost for the
+    # keyword scanner or the (optionally jitted) confidence core
+    list(_scan_keywords("warmup soil weather crop"))
+    _agg_conf(np.ones(1), np.ones(1), 0)
+
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    _warm_cold_start()
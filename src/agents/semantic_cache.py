@@ -0,0 +1,82 @@
+"""Semantic response cache for the orchestrator.
+
+Semantically equivalent queries ("which crop should I plant?" vs "what
+should I grow?") re-run the whole agent pipeline today. This cache
+embeds each query (reusing the pipeline's own Titan embeddings via the
+persistent embedding cache) and reuses a prior full response when a new
+query lands close enough in embedding space for the same (pincode,
+season) bucket and the entry's TTL has not lapsed.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from embeddings.cache import cached_embed
+from utils.logger import logger
+
+class SemanticCache:
+    """Bounded in-memory cache matched by cosine similarity.
+
+    Vectors are L2-normalized on insert so similarity is a single
+    matrix-vector product over the stored entries; FIFO eviction keeps
+    the matrix small enough that a brute-force scan beats maintaining an
+    index.
+    """
+
+    def __init__(self, maxsize=256, threshold=0.92):
+        self._maxsize = maxsize
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._buckets = []    # (pincode, season) per entry
+        self._vectors = []    # L2-normalized query embeddings
+        self._expiries = []
+        self._responses = []
+
+    def get(self, query, pincode, season):
+        try:
+            vector = _normalize(cached_embed(query))
+        except Exception as e:
+            logger.warning("Semantic cache embed failed: %s", e)
+            return None
+
+        bucket = (pincode, season)
+        now = time.monotonic()
+        with self._lock:
+            if not self._vectors:
+                return None
+            candidates = [
+                i for i, b in enumerate(self._buckets)
+                if b == bucket and self._expiries[i] > now
+            ]
+            if not candidates:
+                return None
+            similarities = np.stack([self._vectors[i] for i in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self._threshold:
+                return None
+            return dict(self._responses[candidates[best]])
+
+    def put(self, query, pincode, season, response, ttl):
+        try:
+            vector = _normalize(cached_embed(query))
+        except Exception as e:
+            logger.warning("Semantic cache embed failed: %s", e)
+            return
+
+        with self._lock:
+            if len(self._vectors) >= self._maxsize:
+                self._buckets.pop(0)
+                self._vectors.pop(0)
+                self._expiries.pop(0)
+                self._responses.pop(0)
+            self._buckets.append((pincode, season))
+            self._vectors.append(vector)
+            self._expiries.append(time.monotonic() + ttl)
+            self._responses.append(dict(response))
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
@@ -0,0 +1,638 @@
+"""Soil analysis agent.
+
+Extracts soil parameters from the farmer's query, enriches them with
+learned regional profiles and RAG context, and scores soil health with
+constraints and recommendations.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+import numpy as np
+
+from agents.learning_db import db_get_soil, queue_soil_learn
+from config import SOIL_RAG_SKIP_WHEN_COMPLETE
+from rag.retrieve import (
+    retrieve_documents,
+    retrieve_documents_async,
+    retrieve_documents_batch,
+)
+from utils import jsonio
+from utils.logger import logger
+from utils.ttl_cache import TTLCache
+
+# Retrieval is capped at 3 because only the document count is consumed
+# (rag_context_used — extraction reads the query alone), so fetching
+# the global TOP_K would be wasted vector-search work.
+_SOIL_TOP_K = 3
+
+# Static soil data ships as JSON next to this module: the C-speed JSON
+# parse (orjson when available) beats executing dozens of dict-literal
+# bytecodes at cold start, and the read-only views make the sharing
+# explicit. "regional" holds typical per-state profiles used when
+# nothing has been learned yet; "characteristics" describes each type.
+def _load_soil_profiles():
+    path = os.path.join(os.path.dirname(__file__), "soil_profiles.json")
+    with open(path, "rb") as f:
+        return jsonio.loads(f.read())
+
+_SOIL_DATA = _load_soil_profiles()
+REGIONAL_SOIL_PROFILES = MappingProxyType({
+    state: MappingProxyType(profile) for state, profile in _SOIL_DATA["regional"].items()
+})
+# Characteristics dicts stay plain: they are embedded directly into
+# serialized responses, and orjson cannot dump MappingProxyType
+SOIL_CHARACTERISTICS = MappingProxyType(_SOIL_DATA["characteristics"])
+_DEFAULT_CHARS = SOIL_CHARACTERISTICS["loam"]
+
+# Keyword -> soil type, flattened so type detection is one linear scan
+# of the query instead of up to ~25 independent substring searches.
+# Matching is plain substring (no word boundaries) to keep the original
+# semantics, e.g. "loam" firing inside "loamy".
+_SOIL_TYPE_KEYWORDS = {
+    "alluvial": "alluvial", "river soil": "alluvial",
+    "black soil": "black", "black cotton": "black", "regur": "black",
+    "red soil": "red", "red loam": "red",
+    "laterite": "laterite",
+    "sandy": "sandy", "desert soil": "sandy",
+    "clay soil": "clay", "clayey": "clay",
+    "loam": "loam", "loamy": "loam",
+    "saline": "saline", "usar soil": "saline",
+    "peaty": "peaty", "marshy": "peaty",
+    "forest soil": "forest", "mountain soil": "forest",
+}
+
+try:
+    import ahocorasick
+
+    _TYPE_AUTOMATON = ahocorasick.Automaton()
+    for _kw, _soil_type in _SOIL_TYPE_KEYWORDS.items():
+        _TYPE_AUTOMATON.add_word(_kw, _soil_type)
+    _TYPE_AUTOMATON.make_automaton()
+
+    def _match_soil_type(query_lower):
+        for _, soil_type in _TYPE_AUTOMATON.iter(query_lower):
+            return soil_type
+        return None
+except ImportError:
+    # Same fallback as the orchestrator's intent scanner: one combined
+    # alternation (longest keyword first) is still a single pass
+    _SOIL_TYPE_RE = re.compile("|".join(
+        re.escape(kw) for kw in sorted(_SOIL_TYPE_KEYWORDS, key=len, reverse=True)
+    ))
+
+    def _match_soil_type(query_lower):
+        match = _SOIL_TYPE_RE.search(query_lower)
+        return _SOIL_TYPE_KEYWORDS[match.group()] if match else None
+
+# Every numeric measurement pattern folds into one alternation, scanned
+# with a single finditer pass instead of ~25 independent re.search
+# traversals of the same query. Branch order encodes priority at a
+# shared start position (e.g. "nitrogen ..." before the bare "n ..."
+# form). Group names are the field name plus a disambiguating digit;
+# dispatch strips the digit.
+_MASTER_RE = re.compile("|".join((
+    r"npk\s*(?:ratio)?\s*(?:is|=|:)?\s*(?P<npk_n>\d+)[-:/](?P<npk_p>\d+)[-:/](?P<npk_k>\d+)",
+    r"soil\s+ph\s+(?P<ph1>\d+(?:\.\d+)?)",
+    r"ph\s*(?:level|value)\s*(?:is|=|:)?\s*(?P<ph2>\d+(?:\.\d+)?)",
+    r"ph\s*(?:is|=|:|of)\s*(?P<ph3>\d+(?:\.\d+)?)",
+    r"ph\s+(?P<ph4>\d+(?:\.\d+)?)",
+    r"organic\s*(?:matter|carbon)\s*(?:is|=|:)?\s*(?P<om>\d+(?:\.\d+)?)\s*%?",
+    r"nitrogen\s*(?:is|=|:)?\s*(?P<nitrogen1>\d+(?:\.\d+)?)",
+    r"\bn\s*(?:content|level)\s*(?:is|=|:)?\s*(?P<nitrogen2>\d+(?:\.\d+)?)",
+    r"phosphorus\s*(?:is|=|:)?\s*(?P<phosphorus1>\d+(?:\.\d+)?)",
+    r"\bp\s*(?:content|level)\s*(?:is|=|:)?\s*(?P<phosphorus2>\d+(?:\.\d+)?)",
+    r"potassium\s*(?:is|=|:)?\s*(?P<potassium1>\d+(?:\.\d+)?)",
+    r"potash\s*(?:is|=|:)?\s*(?P<potassium2>\d+(?:\.\d+)?)",
+    r"\bk\s*(?:content|level)\s*(?:is|=|:)?\s*(?P<potassium3>\d+(?:\.\d+)?)",
+    r"zinc\s*(?:is|=|:)?\s*(?P<zinc1>\d+(?:\.\d+)?)",
+    r"\bzn\s*(?:is|=|:)?\s*(?P<zinc2>\d+(?:\.\d+)?)",
+    r"iron\s*(?:is|=|:)?\s*(?P<iron1>\d+(?:\.\d+)?)",
+    r"\bfe\s*(?:is|=|:)?\s*(?P<iron2>\d+(?:\.\d+)?)",
+    r"manganese\s*(?:is|=|:)?\s*(?P<manganese1>\d+(?:\.\d+)?)",
+    r"\bmn\s*(?:is|=|:)?\s*(?P<manganese2>\d+(?:\.\d+)?)",
+    r"copper\s*(?:is|=|:)?\s*(?P<copper1>\d+(?:\.\d+)?)",
+    r"\bcu\s*(?:is|=|:)?\s*(?P<copper2>\d+(?:\.\d+)?)",
+    r"boron\s*(?:is|=|:)?\s*(?P<boron1>\d+(?:\.\d+)?)",
+    r"sulph?ur\s*(?:is|=|:)?\s*(?P<sulfur1>\d+(?:\.\d+)?)",
+    r"(?P<deficient>zinc|iron|manganese|copper|boron|sulph?ur)\s+deficien",
+)))
+
+_NPK_FIELDS = frozenset(("nitrogen", "phosphorus", "potassium"))
+# Delete table keeping only digit bytes: translate against it leaves an
+# empty result exactly when the query carries no number at all
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if b not in b"0123456789")
+
+def _scan_measurements(query_lower):
+    """One pass over the query collecting every numeric measurement.
+
+    Returns (ph, organic_matter, npk, micronutrients); the first
+    occurrence wins per field, an explicit NPK ratio overrides
+    individual N/P/K mentions, and stated deficiencies zero the
+    nutrient.
+    """
+    # Most queries carry no measurements at all. Every numeric branch
+    # needs a digit and the deficiency branch needs its stem; the digit
+    # probe is a single bytes.translate pass in C (deleting every
+    # non-digit byte) instead of ten substring scans, so chat-style
+    # queries skip the alternation after one linear byte scan.
+    if ("deficien" not in query_lower
+            and not query_lower.encode().translate(None, delete=_NON_DIGIT_BYTES)):
+        return None, None, {}, {}
+
+    ph = None
+    om = None
+    npk_ratio = None
+    npk = {}
+    micro = {}
+    deficiencies = []
+    for match in _MASTER_RE.finditer(query_lower):
+        group = match.lastgroup
+        if group == "npk_k":
+            if npk_ratio is None:
+                npk_ratio = (float(match.group("npk_n")),
+                             float(match.group("npk_p")),
+                             float(match.group("npk_k")))
+        elif group == "deficient":
+            deficiencies.append(match.group(group).replace("sulphur", "sulfur"))
+        else:
+            field = group.rstrip("1234")
+            value = float(match.group(group))
+            if field == "ph":
+                if ph is None:
+                    ph = value
+            elif field == "om":
+                if om is None:
+                    om = value
+            elif field in _NPK_FIELDS:
+                npk.setdefault(field, value)
+            else:
+                micro.setdefault(field, value)
+
+    if npk_ratio is not None:
+        npk = dict(zip(("nitrogen", "phosphorus", "potassium"), npk_ratio))
+    for nutrient in deficiencies:
+        micro[nutrient] = 0.0
+    return ph, om, npk, micro
+
+# Full analyses are deterministic in (query, location), and farmer apps
+# repeat near-identical queries per region. Entries expire after ten
+# minutes, and a per-region version counter mixed into the key drops a
+# region's entries the moment a learned profile update lands.
+_ANALYSIS_CACHE = TTLCache(maxsize=512, ttl=600)
+_REGION_VERSIONS = {}
+
+def _analysis_cache_key(query, context):
+    region = (context.get("district") or context.get("state") or "").lower()
+    return (
+        query.lower().strip(),
+        context.get("pincode"),
+        context.get("district"),
+        context.get("state"),
+        _REGION_VERSIONS.get(region, 0),
+    )
+
+def _merge_location_context(soil_data, location_context):
+    if soil_data.type == "unknown" and location_context.get("soil_type"):
+        # Learned profiles come from DynamoDB, so normalize here too:
+        # downstream table lookups rely on lowercase interned types
+        soil_data.type = sys.intern(location_context["soil_type"].lower())
+        soil_data.data_sources.append(location_context["source"])
+    if "user_query_ph" not in soil_data.data_sources and location_context.get("ph"):
+        soil_data.ph = location_context["ph"]
+
+def analyze_soil(query, context, docs=None, location_context=None,
+                 soil_data=None, analysis=None):
+    """Analyze soil from the query text plus learned regional context.
+
+    ``docs`` and ``location_context`` let batch/async callers hand in
+    pre-fetched inputs; ``soil_data``/``analysis`` let the batch path
+    hand in already-merged parameters and vectorized scores. The plain
+    sync path fetches and computes everything itself.
+    """
+    try:
+        query_lower = query.lower()
+        region = (context.get("district") or context.get("state") or "").lower()
+        cache_key = _analysis_cache_key(query, context)
+        cached = _ANALYSIS_CACHE.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        if soil_data is None:
+            # Extraction runs first: when the query already states a
+            # soil type and pH, the RAG documents contribute nothing and
+            # the vector-search round trip (the single most expensive
+            # step) is skipped outright
+            soil_data = _extract_soil_parameters(query_lower)
+            if docs is None:
+                if _extraction_complete(soil_data):
+                    docs = []
+                else:
+                    docs = retrieve_documents(f"soil analysis {query}", top_k=_SOIL_TOP_K)
+            if location_context is None:
+                location_context = _get_location_context(context)
+            _merge_location_context(soil_data, location_context)
+
+        if analysis is None:
+            analysis = _analyze_soil_data(soil_data)
+        health_score, confidence, constraints, recommendations = analysis
+
+        # Persist high-confidence extractions so the region's defaults
+        # improve. The learn is queued for the background batch writer,
+        # so the DynamoDB write no longer sits on the response path.
+        user_provided = "user_query_ph" in soil_data.data_sources
+        if user_provided:
+            # Write under the exact normalized keys the readers in
+            # _get_location_context look up — a raw "Pune" or
+            # "Uttar Pradesh" would land under a key nobody reads
+            district_key = (context.get("district") or "").lower()
+            state_key = (context.get("state") or "").lower().replace(" ", "_")
+            queue_soil_learn(district_key or state_key, {
+                "soil_type": soil_data.type,
+                "ph": soil_data.ph,
+                "organic_matter": soil_data.organic_matter,
+            })
+            # Invalidate the region's cached analyses: bumping the
+            # version orphans old keys, and TTL reclaims them
+            _REGION_VERSIONS[region] = _REGION_VERSIONS.get(region, 0) + 1
+            # Also drop the cached DB profile (or its negative-miss
+            # sentinel); the queued write lands
+            # within ~200 ms, so a racing read at worst re-fetches the
+            # previous profile once
+            _SOIL_DB_CACHE.pop(district_key)
+            _SOIL_DB_CACHE.pop(state_key)
+            # The bump above also rotated this query's own key;
+            # recompute it so the response is stored under the live
+            # version and the repeat query actually hits
+            cache_key = _analysis_cache_key(query, context)
+
+        response = {
+            "type": soil_data.type,
+            "ph": soil_data.ph,
+            "organic_matter": soil_data.organic_matter,
+            "npk_levels": soil_data.npk_levels,
+            "micronutrients": soil_data.micronutrients,
+            "health_score": health_score,
+            "confidence": confidence,
+            "constraints": constraints,
+            "recommendations": recommendations,
+            "soil_characteristics": SOIL_CHARACTERISTICS.get(soil_data.type, _DEFAULT_CHARS),
+            "location_context": location_context,
+            "data_sources": soil_data.data_sources,
+            "data_freshness": "user_provided" if user_provided else "estimated",
+            "rag_context_used": len(docs),
+        }
+        _ANALYSIS_CACHE.put(cache_key, response)
+        return dict(response)
+    except Exception as e:
+        logger.error("Soil analysis failed: %s", e)
+        return {
+            "type": "unknown",
+            "ph": 7.0,
+            "organic_matter": 0.5,
+            "npk_levels": {},
+            "micronutrients": {},
+            "health_score": 5,
+            "confidence": 0.1,
+            "constraints": [],
+            "recommendations": [],
+            "soil_characteristics": _DEFAULT_CHARS,
+            "location_context": {},
+            "data_sources": [],
+            "data_freshness": "unknown",
+            "rag_context_used": 0,
+            "error": str(e),
+        }
+
+def _extraction_complete(soil_data):
+    """True when the query alone supplied the fields retrieval would
+    only corroborate (explicit soil type and pH)."""
+    return (
+        SOIL_RAG_SKIP_WHEN_COMPLETE
+        and soil_data.type != "unknown"
+        and "user_query_ph" in soil_data.data_sources
+    )
+
+# In-flight analyses by cache key: a burst of identical queries (mobile
+# retries, batch fan-out) coalesces onto one computation instead of N
+# full RAG + DB pipelines. The event loop is single-threaded, so the
+# dict needs no lock; entries never outlive the request that owns them.
+_INFLIGHT = {}
+
+async def analyze_soil_async(query, context):
+    """Async soil analysis overlapping the two independent network
+    stages — RAG retrieval and the location-context DynamoDB reads —
+    instead of paying their latencies back to back. Identical
+    concurrent calls share a single computation."""
+    key = _analysis_cache_key(query, context)
+    cached = _ANALYSIS_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    inflight = _INFLIGHT.get(key)
+    if inflight is not None:
+        # Shield so one cancelled waiter cannot kill the shared future
+        return dict(await asyncio.shield(inflight))
+
+    future = asyncio.get_running_loop().create_future()
+    _INFLIGHT[key] = future
+    try:
+        result = await _analyze_soil_async_impl(query, context)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved even with no waiters
+        raise
+    finally:
+        _INFLIGHT.pop(key, None)
+
+async def _analyze_soil_async_impl(query, context):
+    # Cheap probe (extraction is gated regex work) to decide whether the
+    # retrieval round trip is needed at all
+    if _extraction_complete(_extract_soil_parameters(query.lower())):
+        location_context = await _get_location_context_async(context)
+        return await asyncio.to_thread(analyze_soil, query, context, [], location_context)
+
+    docs, location_context = await asyncio.gather(
+        retrieve_documents_async(f"soil analysis {query}", top_k=_SOIL_TOP_K),
+        _get_location_context_async(context),
+    )
+    return await asyncio.to_thread(analyze_soil, query, context, docs, location_context)
+
+def analyze_soil_batch(items):
+    """Analyze several (query, context) pairs, amortizing retrieval.
+
+    All RAG retrievals for the batch go out as one concurrent fan-out
+    (duplicate queries collapse to a single search); extraction runs as
+    a plain loop and scoring as one vectorized pass over the whole
+    batch. Results come back in input order.
+    """
+    docs_per_item = retrieve_documents_batch(
+        [f"soil analysis {query}" for query, _ in items], top_k=_SOIL_TOP_K
+    )
+    # Assemble merged parameters per item first so the whole batch can
+    # be scored in one vectorized pass
+    prepared = []
+    for (query, context), docs in zip(items, docs_per_item):
+        soil_data = _extract_soil_parameters(query.lower())
+        location_context = _get_location_context(context)
+        _merge_location_context(soil_data, location_context)
+        prepared.append((query, context, docs, location_context, soil_data))
+
+    analyses = _analyze_soil_data_batch([p[4] for p in prepared])
+    return [
+        analyze_soil(query, context, docs, location_context,
+                     soil_data=soil_data, analysis=analysis)
+        for (query, context, docs, location_context, soil_data), analysis
+        in zip(prepared, analyses)
+    ]
+
+@dataclass(slots=True)
+class SoilData:
+    """Extracted soil parameters in flight between extraction and the
+    response boundary: slot reads beat dict hashing for the ~20 field
+    accesses per analysis, mirroring OrchestratorResponse."""
+    type: str = "unknown"
+    ph: float = 7.0
+    organic_matter: float = 0.5
+    npk_levels: dict = field(default_factory=dict)
+    micronutrients: dict = field(default_factory=dict)
+    data_sources: list = field(default_factory=list)
+
+def _extract_soil_parameters(query_lower):
+    soil_data = SoilData()
+
+    soil_type = _match_soil_type(query_lower)
+    if soil_type:
+        soil_data.type = soil_type
+        soil_data.data_sources.append("user_query")
+
+    ph, om, npk, micro = _scan_measurements(query_lower)
+    if ph is not None and 0 < ph <= 14:
+        soil_data.ph = ph
+        soil_data.data_sources.append("user_query_ph")
+    if om is not None:
+        soil_data.organic_matter = om
+        soil_data.data_sources.append("user_query_om")
+    soil_data.npk_levels = npk
+    soil_data.micronutrients = micro
+
+    return soil_data
+
+# Learned regional profiles change rarely, so a five-minute TTL cache
+# turns the per-request DynamoDB GetItem round trips (5-20 ms each)
+# into dict hits for repeated regions; learns evict the region below.
+# Misses are cached too (negative caching): most regions have no
+# learned profile yet, and without this every request for them pays
+# both GetItem round trips forever. The sentinel gets a short TTL so a
+# profile learned by another container shows up within a minute.
+_SOIL_DB_CACHE = TTLCache(maxsize=1024, ttl=300)
+_DB_MISS = object()
+_DB_MISS_TTL = 60
+
+def _cached_db_get_soil(region):
+    profile = _SOIL_DB_CACHE.get(region)
+    if profile is _DB_MISS:
+        return None
+    if profile is None:
+        profile = db_get_soil(region)
+        if profile is None:
+            _SOIL_DB_CACHE.put(region, _DB_MISS, ttl=_DB_MISS_TTL)
+        else:
+            _SOIL_DB_CACHE.put(region, profile)
+    return profile
+
+def _get_location_context(context):
+    district = (context.get("district") or "").lower()
+    state = (context.get("state") or "").lower().replace(" ", "_")
+
+    learned = _cached_db_get_soil(district)
+    if learned:
+        return dict(learned, source="learned_district", confidence=0.8)
+
+    return _location_context_fallback(_cached_db_get_soil(state), state)
+
+async def _get_location_context_async(context):
+    """Like _get_location_context, but the district and state lookups
+    fly together; the district-over-state priority applies at the join."""
+    district = (context.get("district") or "").lower()
+    state = (context.get("state") or "").lower().replace(" ", "_")
+
+    learned_district, learned_state = await asyncio.gather(
+        asyncio.to_thread(_cached_db_get_soil, district),
+        asyncio.to_thread(_cached_db_get_soil, state),
+    )
+    if learned_district:
+        return dict(learned_district, source="learned_district", confidence=0.8)
+
+    return _location_context_fallback(learned_state, state)
+
+def _location_context_fallback(learned_state, state):
+    if learned_state:
+        return dict(learned_state, source="learned_state", confidence=0.6)
+
+    profile = REGIONAL_SOIL_PROFILES.get(state)
+    if profile:
+        return dict(profile, source="regional_profile", confidence=0.5)
+
+    return {"source": "none", "confidence": 0.0}
+
+# Per-type scoring and advice tables, hoisted out of the per-request
+# helpers: the dict literals were rebuilt (dozens of allocations) on
+# every call. Read-only views with tuple values make the sharing safe;
+# the identifier-like keys are interned by the compiler, so lookups on
+# an interned soil type hash by identity.
+_TYPE_SCORES = MappingProxyType({
+    "alluvial": 2, "loam": 2, "black": 1, "red": 0, "clay": 0,
+    "forest": 1, "laterite": -1, "sandy": -1, "peaty": 0, "saline": -2,
+})
+_TYPE_CONSTRAINTS = MappingProxyType({
+    "sandy": ("Low water retention - frequent irrigation needed",),
+    "clay": ("Poor drainage - risk of waterlogging",),
+    "saline": ("High salinity - restricts most crops",),
+    "laterite": ("Low fertility - heavy amendment needed",),
+    "black": ("Hard when dry, sticky when wet - narrow tillage window",),
+})
+_TYPE_RECOMMENDATIONS = MappingProxyType({
+    "sandy": ("Add compost or FYM to improve water retention", "Use drip irrigation"),
+    "clay": ("Add gypsum and organic matter to improve drainage", "Create raised beds"),
+    "saline": ("Apply gypsum and leach salts with good-quality water",),
+    "laterite": ("Apply lime and build organic matter over seasons",),
+    "black": ("Time tillage to soil moisture", "Ensure drainage before kharif"),
+})
+
+# Advice assembly lives in two generators so each final list is
+# allocated once at its known size via list(); the type-table tuples
+# stream through yield from without an intermediate copy. Both the
+# scalar and batch scorers share these.
+
+def _iter_constraints(soil_data):
+    yield from _TYPE_CONSTRAINTS.get(soil_data.type, ())
+    if soil_data.ph < 5.5:
+        yield f"Acidic soil (pH {soil_data.ph}) - may require liming"
+    elif soil_data.ph > 8.5:
+        yield f"Alkaline soil (pH {soil_data.ph}) - may require gypsum"
+    if soil_data.organic_matter < 0.3:
+        yield "Very low organic matter - poor soil structure"
+    npk = soil_data.npk_levels
+    if npk.get("nitrogen", 280) < 280:
+        yield "Low nitrogen availability"
+    if npk.get("phosphorus", 11) < 11:
+        yield "Low phosphorus availability"
+    if npk.get("potassium", 120) < 120:
+        yield "Low potassium availability"
+
+def _iter_recommendations(soil_data):
+    yield from _TYPE_RECOMMENDATIONS.get(soil_data.type, ())
+    if soil_data.ph < 5.5:
+        yield "Apply agricultural lime to raise pH"
+    elif soil_data.ph > 8.5:
+        yield "Apply gypsum and organic matter to lower pH"
+    if soil_data.organic_matter < 0.5:
+        yield "Incorporate green manure or compost annually"
+    npk = soil_data.npk_levels
+    if npk.get("nitrogen", 280) < 280:
+        yield "Split-apply urea or add legumes in rotation"
+    if npk.get("phosphorus", 11) < 11:
+        yield "Apply DAP or rock phosphate at sowing"
+    if npk.get("potassium", 120) < 120:
+        yield "Apply MOP based on soil test"
+
+def _analyze_soil_data(soil_data):
+    """Score health and derive constraints plus recommendations.
+
+    Numeric scoring reads every field once in a single fused pass; the
+    advice lists materialize from the shared generators above.
+    Returns (health_score, confidence, constraints, recommendations).
+    """
+    # "type" is normalized (lowercase, interned) at extraction time, so
+    # no per-call .lower() here; slot reads replace the old dict .gets
+    soil_type = soil_data.type
+    ph = soil_data.ph
+    om = soil_data.organic_matter
+    npk = soil_data.npk_levels
+
+    score = 5
+    confidence = 0.3
+
+    if soil_type in _TYPE_SCORES:
+        score += _TYPE_SCORES[soil_type]
+        confidence += 0.2
+
+    if 6.0 <= ph <= 7.5:
+        score += 2
+    elif 5.5 <= ph <= 8.0:
+        score += 1
+    elif ph < 5.0 or ph > 8.5:
+        score -= 2
+    if "user_query_ph" in soil_data.data_sources:
+        confidence += 0.3
+
+    if om >= 0.75:
+        score += 1
+    elif om < 0.3:
+        score -= 1
+
+    if npk:
+        confidence += 0.2
+        if len(npk) == 3:
+            score += 1
+
+    constraints = list(_iter_constraints(soil_data)) or ["No major constraints identified"]
+    recommendations = (
+        list(_iter_recommendations(soil_data))
+        or ["Maintain current practices; retest soil annually"]
+    )
+    return max(1, min(10, score)), round(min(1.0, confidence), 2), constraints, recommendations
+
+# Structure-of-arrays companions to _TYPE_SCORES for the batch scorer
+_TYPE_CODES = {name: i for i, name in enumerate(_TYPE_SCORES)}
+_TYPE_SCORE_LUT = np.array(list(_TYPE_SCORES.values()), dtype=np.int64)
+
+def _analyze_soil_data_batch(soil_datas):
+    """Vectorized _analyze_soil_data over many merged records.
+
+    One array per field across the batch (SoA) with np.select over the
+    threshold bands, so scores and confidences for the whole batch cost
+    a handful of numpy passes instead of per-record Python branching.
+    The advice strings are then assembled per record from the same
+    thresholds. The single-item path keeps the scalar version.
+    """
+    n = len(soil_datas)
+    ph = np.fromiter((s.ph for s in soil_datas), dtype=np.float64, count=n)
+    om = np.fromiter((s.organic_matter for s in soil_datas), dtype=np.float64, count=n)
+    codes = np.fromiter(
+        (_TYPE_CODES.get(s.type, -1) for s in soil_datas), dtype=np.int64, count=n
+    )
+    npk_len = np.fromiter((len(s.npk_levels) for s in soil_datas), dtype=np.int64, count=n)
+    user_ph = np.fromiter(
+        ("user_query_ph" in s.data_sources for s in soil_datas), dtype=bool, count=n
+    )
+
+    known = codes >= 0
+    type_bonus = np.where(known, _TYPE_SCORE_LUT[np.where(known, codes, 0)], 0)
+    ph_bonus = np.select(
+        [(ph >= 6.0) & (ph <= 7.5), (ph >= 5.5) & (ph <= 8.0), (ph < 5.0) | (ph > 8.5)],
+        [2, 1, -2], default=0,
+    )
+    om_bonus = np.select([om >= 0.75, om < 0.3], [1, -1], default=0)
+    scores = np.clip(5 + type_bonus + ph_bonus + om_bonus + (npk_len == 3), 1, 10)
+    confidences = np.minimum(
+        1.0, 0.3 + 0.2 * known + 0.3 * user_ph + 0.2 * (npk_len > 0)
+    ).round(2)
+
+    results = []
+    for i, s in enumerate(soil_datas):
+        results.append((
+            scores[i].item(),
+            confidences[i].item(),
+            list(_iter_constraints(s)) or ["No major constraints identified"],
+            list(_iter_recommendations(s))
+            or ["Maintain current practices; retest soil annually"],
+        ))
+    return results
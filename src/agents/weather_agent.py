@@ -0,0 +1,470 @@
+"""Weather analysis agent.
+
+Resolves the farmer's location to coordinates, fetches a live
+Open-Meteo forecast (falling back to regional seasonal profiles),
+detects the cropping season and assesses weather risks and crop
+suitability.
+"""
+
+import asyncio
+import datetime
+import functools
+import math
+import re
+import statistics
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from agents.learning_db import db_get_pincode, learn_pincode_location, queue_weather_observation
+from utils.logger import logger
+from utils.ttl_cache import TTLCache
+
+# Forecasts barely move within 15 minutes and many farmers share the
+# same coordinates, so hot locations answer from the cache instead of
+# paying the Open-Meteo round trip. Keys round to 2 decimals (~1 km
+# buckets). Failures are cached too, but only for 30 s, so a flaky
+# upstream does not hammer every request yet recovers quickly.
+_WEATHER_CACHE = TTLCache(maxsize=512, ttl=900)
+_WEATHER_MISS = object()
+_WEATHER_MISS_TTL = 30
+
+@functools.cache
+def _get_http_session():
+    """Pooled HTTP session for Open-Meteo, or None without requests.
+
+    A module-lifetime Session reuses TCP+TLS connections across
+    invocations in a warm container, saving the two handshake round
+    trips urllib pays on every call. Falls back to plain urllib when
+    requests is not installed.
+    """
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter, Retry
+    except ImportError:
+        return None
+    session = requests.Session()
+    session.headers["User-Agent"] = "FarmerAssistant/1.0"
+    session.mount("https://", HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    ))
+    return session
+
+# Approximate centroids by 2-digit pincode prefix
+PINCODE_COORDINATES = {
+    "11": (28.61, 77.21),  # Delhi
+    "14": (30.79, 75.85),  # Punjab
+    "12": (28.46, 76.99),  # Haryana
+    "20": (26.85, 80.95),  # Uttar Pradesh
+    "30": (26.91, 75.79),  # Rajasthan
+    "38": (23.03, 72.58),  # Gujarat
+    "40": (19.08, 72.88),  # Maharashtra
+    "45": (23.26, 77.41),  # Madhya Pradesh
+    "50": (17.39, 78.49),  # Telangana
+    "52": (16.51, 80.64),  # Andhra Pradesh
+    "56": (12.97, 77.59),  # Karnataka
+    "60": (13.08, 80.27),  # Tamil Nadu
+    "68": (9.93, 76.27),   # Kerala
+    "70": (22.57, 88.36),  # West Bengal
+    "75": (20.27, 85.84),  # Odisha
+    "80": (25.59, 85.14),  # Bihar
+}
+
+STATE_COORDINATES = {
+    "punjab": (30.79, 75.85),
+    "haryana": (29.06, 76.09),
+    "uttar_pradesh": (26.85, 80.95),
+    "bihar": (25.59, 85.14),
+    "west_bengal": (22.57, 88.36),
+    "maharashtra": (19.75, 75.71),
+    "madhya_pradesh": (23.26, 77.41),
+    "gujarat": (22.26, 71.19),
+    "rajasthan": (26.91, 75.79),
+    "karnataka": (15.32, 75.71),
+    "tamil_nadu": (11.13, 78.66),
+    "andhra_pradesh": (15.91, 79.74),
+    "telangana": (17.87, 79.59),
+    "kerala": (10.85, 76.27),
+    "odisha": (20.95, 85.10),
+}
+
+# Seasonal climate normals per region: temp in °C, rainfall in mm/season
+REGIONAL_WEATHER_PROFILES = {
+    "north": {
+        "kharif": {"temp_min": 24, "temp_max": 38, "rainfall": 650, "humidity": 70, "frost_risk": "none"},
+        "rabi": {"temp_min": 6, "temp_max": 22, "rainfall": 80, "humidity": 55, "frost_risk": "high"},
+        "zaid": {"temp_min": 22, "temp_max": 42, "rainfall": 40, "humidity": 35, "frost_risk": "none"},
+    },
+    "central": {
+        "kharif": {"temp_min": 23, "temp_max": 34, "rainfall": 900, "humidity": 75, "frost_risk": "none"},
+        "rabi": {"temp_min": 10, "temp_max": 28, "rainfall": 50, "humidity": 50, "frost_risk": "low"},
+        "zaid": {"temp_min": 24, "temp_max": 41, "rainfall": 30, "humidity": 30, "frost_risk": "none"},
+    },
+    "south": {
+        "kharif": {"temp_min": 23, "temp_max": 32, "rainfall": 750, "humidity": 78, "frost_risk": "none"},
+        "rabi": {"temp_min": 18, "temp_max": 30, "rainfall": 250, "humidity": 65, "frost_risk": "none"},
+        "zaid": {"temp_min": 24, "temp_max": 37, "rainfall": 120, "humidity": 55, "frost_risk": "none"},
+    },
+    "east": {
+        "kharif": {"temp_min": 25, "temp_max": 33, "rainfall": 1100, "humidity": 82, "frost_risk": "none"},
+        "rabi": {"temp_min": 12, "temp_max": 26, "rainfall": 60, "humidity": 60, "frost_risk": "low"},
+        "zaid": {"temp_min": 24, "temp_max": 38, "rainfall": 150, "humidity": 60, "frost_risk": "none"},
+    },
+}
+
+# SoA repack of the profiles: one contiguous (region, season, metric)
+# int array plus a parallel frost table, so a profile lookup is a
+# single indexed row instead of chasing three nested dicts and five
+# .get calls. The dict above stays the readable source of truth.
+_PROFILE_SEASONS = ("kharif", "rabi", "zaid")
+_PROFILE_METRICS = ("temp_min", "temp_max", "rainfall", "humidity")
+_REGION_INDEX = {region: i for i, region in enumerate(REGIONAL_WEATHER_PROFILES)}
+_SEASON_INDEX = {season: i for i, season in enumerate(_PROFILE_SEASONS)}
+_PROFILE_ARRAY = np.array(
+    [[[profiles[season][metric] for metric in _PROFILE_METRICS]
+      for season in _PROFILE_SEASONS]
+     for profiles in REGIONAL_WEATHER_PROFILES.values()],
+    dtype=np.int64,
+)
+_FROST_TABLE = tuple(
+    tuple(profiles[season]["frost_risk"] for season in _PROFILE_SEASONS)
+    for profiles in REGIONAL_WEATHER_PROFILES.values()
+)
+_DEFAULT_REGION_IX = _REGION_INDEX["central"]
+
+STATE_TO_REGION = {
+    "punjab": "north", "haryana": "north", "uttar_pradesh": "north", "rajasthan": "north",
+    "madhya_pradesh": "central", "maharashtra": "central", "gujarat": "central",
+    "karnataka": "south", "tamil_nadu": "south", "andhra_pradesh": "south",
+    "telangana": "south", "kerala": "south",
+    "bihar": "east", "west_bengal": "east", "odisha": "east",
+}
+
+# Scalar defaults for the failure response, built once; the except
+# path copies this and fills in the nested members per call instead of
+# re-allocating the full 13-key literal on every cascading failure
+_ERROR_RESPONSE_TEMPLATE = {
+    "season": "kharif",
+    "season_source": "default",
+    "region": "central",
+    "rainfall": 500,
+    "rainfall_pattern": "moderate",
+    "humidity": 60,
+    "frost_risk": "none",
+    "data_freshness": "unknown",
+    "confidence": 0.1,
+}
+
+@functools.lru_cache(maxsize=256)
+def _norm_state(state):
+    """Normalized state key ("Uttar Pradesh" -> "uttar_pradesh").
+
+    The same handful of states repeats across requests, so memoizing
+    replaces the two string allocations per call with a cache hit.
+    """
+    return state.lower().replace(" ", "_")
+
+def analyze_weather(query, context):
+    """Analyze weather for the farmer's location and season."""
+    try:
+        # The learned-pincode resolution (DynamoDB read, and an India
+        # Post call for first sightings) and the Open-Meteo fetch are
+        # independent network hops, so they fly together: the forecast
+        # is issued against the provisional prefix/state centroid while
+        # the learned lookup refines the location confidence. Both
+        # centroids are state-granularity, so the forecast point is
+        # effectively the same.
+        pincode = str(context.get("pincode") or "")
+        learn_future = _EXECUTOR.submit(_learned_coordinates, pincode) if pincode else None
+
+        lat, lon, location_confidence = _provisional_coordinates(context)
+        weather_future = None
+        if lat is not None:
+            weather_future = _EXECUTOR.submit(_fetch_live_weather, lat, lon)
+
+        if learn_future is not None:
+            try:
+                learned = learn_future.result(timeout=6)
+            except Exception as e:
+                logger.warning("Pincode resolution failed for %s: %s", pincode, e)
+                learned = None
+            if learned is not None:
+                lat, lon, location_confidence = learned
+                if weather_future is None:
+                    weather_future = _EXECUTOR.submit(_fetch_live_weather, lat, lon)
+
+        live_weather = weather_future.result() if weather_future is not None else None
+
+        season, season_source = _extract_season_info(query.lower())
+
+        state = _norm_state(context.get("state") or "")
+        region = STATE_TO_REGION.get(state, "central")
+        weather_data = _get_weather_data(region, season, live_weather)
+
+        suitability = _calculate_suitability(weather_data)
+        risk_assessment = _assess_weather_risks(weather_data)
+
+        if live_weather:
+            # Fire-and-forget: the background batch writer owns the
+            # DynamoDB round trip
+            queue_weather_observation(state, live_weather)
+
+        confidence = 0.8 if live_weather else 0.5
+        confidence = round(min(1.0, confidence * (0.7 + 0.3 * location_confidence)), 2)
+
+        logger.info("Weather analyzed: season=%s, region=%s, live=%s", season, region, live_weather is not None)
+        return {
+            "season": season,
+            "season_source": season_source,
+            "region": region,
+            "temperature_range": {
+                "min": weather_data["temp_min"],
+                "max": weather_data["temp_max"],
+            },
+            "rainfall": weather_data["rainfall"],
+            "rainfall_pattern": weather_data["rainfall_pattern"],
+            "humidity": weather_data["humidity"],
+            "frost_risk": weather_data["frost_risk"],
+            "suitability": suitability,
+            "risk_assessment": risk_assessment,
+            "data_freshness": "live" if live_weather else "historical",
+            "confidence": confidence,
+            "data_sources": ["open_meteo"] if live_weather else ["regional_profile"],
+        }
+    except Exception as e:
+        logger.error("Weather analysis failed: %s", e)
+        response = _ERROR_RESPONSE_TEMPLATE.copy()
+        # Mutable members are rebuilt per response so callers can edit
+        # their copy without corrupting the template
+        response["temperature_range"] = {"min": 20, "max": 35}
+        response["suitability"] = {"score": 0.5, "label": "moderate"}
+        response["risk_assessment"] = {
+            "drought": {"level": "none"},
+            "flood": {"level": "none"},
+            "frost": {"level": "none"},
+            "disease": {"level": "none"},
+        }
+        response["data_sources"] = []
+        response["error"] = str(e)
+        return response
+
+async def analyze_weather_async(query, context):
+    """Async wrapper so the orchestrator can overlap agents."""
+    return await asyncio.to_thread(analyze_weather, query, context)
+
+# Shared pool for the parallel location/forecast fan-out; sized for the
+# at-most-two in-flight calls per request plus headroom
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+def _provisional_coordinates(context):
+    """Best coordinates available without any network round trip."""
+    pincode = str(context.get("pincode") or "")
+    if pincode:
+        prefix = pincode[:2]
+        if prefix in PINCODE_COORDINATES:
+            lat, lon = PINCODE_COORDINATES[prefix]
+            logger.info("Coordinates from pincode prefix %s: %s,%s", prefix, lat, lon)
+            return lat, lon, 0.7
+
+    state = _norm_state(context.get("state") or "")
+    if state in STATE_COORDINATES:
+        lat, lon = STATE_COORDINATES[state]
+        logger.info("Coordinates from state %s: %s,%s", state, lat, lon)
+        return lat, lon, 0.5
+
+    return None, None, 0.0
+
+def _learned_coordinates(pincode):
+    """Learned-pincode coordinates, or None; may hit DynamoDB and,
+    for first sightings, the India Post API."""
+    learned = db_get_pincode(pincode)
+    if not learned:
+        # First sighting of this pincode: resolve and persist it
+        learned = learn_pincode_location(pincode)
+    if learned:
+        state = _norm_state(learned.get("state") or "")
+        if state in STATE_COORDINATES:
+            lat, lon = STATE_COORDINATES[state]
+            logger.info("Coordinates from learned pincode %s: %s,%s", pincode, lat, lon)
+            return lat, lon, 0.9
+    return None
+
+def _fetch_live_weather(lat, lon):
+    import urllib.request
+
+    from utils import jsonio
+
+    cache_key = (round(lat, 2), round(lon, 2))
+    cached = _WEATHER_CACHE.get(cache_key)
+    if cached is not None:
+        return None if cached is _WEATHER_MISS else dict(cached)
+
+    url = (
+        "https://api.open-meteo.com/v1/forecast"
+        f"?latitude={lat}&longitude={lon}"
+        "&daily=temperature_2m_min,temperature_2m_max,precipitation_sum"
+        "&forecast_days=7&timezone=auto"
+    )
+    session = _get_http_session()
+    try:
+        if session is not None:
+            resp = session.get(url, timeout=5)
+            resp.raise_for_status()
+            data = jsonio.loads(resp.content)
+        else:
+            with urllib.request.urlopen(url, timeout=5) as resp:
+                data = jsonio.loads(resp.read())
+    except Exception as e:
+        logger.warning("Live weather fetch failed: %s", e)
+        _WEATHER_CACHE.put(cache_key, _WEATHER_MISS, ttl=_WEATHER_MISS_TTL)
+        return None
+
+    daily = data.get("daily", {})
+    temp_mins = daily.get("temperature_2m_min", [])
+    temp_maxs = daily.get("temperature_2m_max", [])
+    precip_sums = daily.get("precipitation_sum", [])
+
+    # fmean and fsum run the reductions in C (and without float
+    # accumulation error) instead of bytecode-dispatched sum loops
+    avg_temp_min = statistics.fmean(temp_mins) if temp_mins else 20
+    avg_temp_max = statistics.fmean(temp_maxs) if temp_maxs else 35
+    total_precip = math.fsum(precip_sums) if precip_sums else 0
+
+    logger.info("Live weather fetched: temp=%s-%s°C, rainfall=%smm", avg_temp_min, avg_temp_max, total_precip)
+    weather = {
+        "temp_min": round(avg_temp_min, 1),
+        "temp_max": round(avg_temp_max, 1),
+        "forecast_rainfall_mm": round(total_precip, 1),
+    }
+    _WEATHER_CACHE.put(cache_key, weather)
+    return weather
+
+# Inverted keyword index plus one alternation compiled at import: the
+# old code ran up to ~20 substring scans per call and then re-ran the
+# double loop just to name the matching keyword. Longest-first ordering
+# keeps multi-word keywords ahead of their prefixes.
+_SEASON_KEYWORDS = {
+    "kharif": ("kharif", "monsoon", "rainy season", "june", "july", "august", "september"),
+    "rabi": ("rabi", "winter crop", "october", "november", "december", "january"),
+    "zaid": ("zaid", "summer crop", "march", "april", "may"),
+}
+_KEYWORD_TO_SEASON = {kw: season for season, kws in _SEASON_KEYWORDS.items() for kw in kws}
+_SEASON_KW_RE = re.compile(
+    "|".join(map(re.escape, sorted(_KEYWORD_TO_SEASON, key=len, reverse=True)))
+)
+_MONTH_TO_SEASON = {
+    1: "rabi", 2: "rabi", 3: "zaid", 4: "zaid", 5: "zaid",
+    6: "kharif", 7: "kharif", 8: "kharif", 9: "kharif",
+    10: "rabi", 11: "rabi", 12: "rabi",
+}
+
+@functools.lru_cache(maxsize=512)
+def _season_from_query(query_lower):
+    match = _SEASON_KW_RE.search(query_lower)
+    if match:
+        return _KEYWORD_TO_SEASON[match.group()], f"query_keyword:{match.group()}"
+    return None
+
+def _extract_season_info(query_lower):
+    hit = _season_from_query(query_lower)
+    if hit is not None:
+        return hit
+    # Month fallback stays outside the memoized scan: the answer shifts
+    # with the calendar, not the query
+    return _MONTH_TO_SEASON[datetime.date.today().month], "current_month"
+
+def _get_weather_data(region, season, live_weather):
+    region_ix = _REGION_INDEX.get(region, _DEFAULT_REGION_IX)
+    season_ix = _SEASON_INDEX[season]
+    row = _PROFILE_ARRAY[region_ix, season_ix]
+    # .item() emits native Python ints so the response serializes
+    # exactly as the dict-backed values did
+    weather_data = {
+        "temp_min": row[0].item(),
+        "temp_max": row[1].item(),
+        "rainfall": row[2].item(),
+        "humidity": row[3].item(),
+        "frost_risk": _FROST_TABLE[region_ix][season_ix],
+    }
+
+    if live_weather:
+        weather_data["temp_min"] = live_weather["temp_min"]
+        weather_data["temp_max"] = live_weather["temp_max"]
+        # Scale the 7-day forecast up to an indicative seasonal figure
+        weather_data["rainfall"] = round(live_weather["forecast_rainfall_mm"] * 13)
+
+    weather_data["rainfall_pattern"] = _RAIN_LABELS[
+        bisect_right(_RAIN_THRESHOLDS, weather_data["rainfall"])
+    ]
+
+    logger.info("Weather data for %s/%s: %s", region, season, weather_data["rainfall_pattern"])
+    return weather_data
+
+# Band tables replacing the if/elif ladders: bisect_right maps strict
+# upper bounds (rainfall pattern, score label), bisect_left makes upper
+# bounds inclusive (suitability bands). Rainfall and humidity are
+# always integers here, so their exclusive bounds shift down by one.
+_RAIN_THRESHOLDS = (100, 400, 800, 1500)
+_RAIN_LABELS = ("scanty", "light", "moderate", "heavy", "very_heavy")
+# 20 and 25 open bands from below, so they sit just under the bound;
+# temperatures are quantized to one decimal, making 19.95/24.95 exact
+_SUIT_TEMP_THRESHOLDS = (19.95, 24.95, 35, 40, 44)
+_SUIT_TEMP_BONUS = (0.0, 0.1, 0.2, 0.1, 0.0, -0.2)
+_SUIT_RAIN_THRESHOLDS = (79, 149, 399, 1200, 1800)
+_SUIT_RAIN_BONUS = (-0.2, 0.0, 0.1, 0.2, 0.1, 0.0)
+_SUIT_HUMIDITY_THRESHOLDS = (49, 75, 90)
+_SUIT_HUMIDITY_BONUS = (0.0, 0.1, 0.0, -0.1)
+_SUIT_LABEL_THRESHOLDS = (0.4, 0.7)
+_SUIT_LABELS = ("poor", "moderate", "good")
+
+def _calculate_suitability(weather_data):
+    score = (
+        0.5
+        + _SUIT_TEMP_BONUS[bisect_left(_SUIT_TEMP_THRESHOLDS, weather_data["temp_max"])]
+        + _SUIT_RAIN_BONUS[bisect_left(_SUIT_RAIN_THRESHOLDS, weather_data["rainfall"])]
+        + _SUIT_HUMIDITY_BONUS[bisect_left(_SUIT_HUMIDITY_THRESHOLDS, weather_data["humidity"])]
+    )
+    if weather_data["frost_risk"] == "high":
+        score -= 0.1
+
+    score = max(0.0, min(1.0, score))
+    label = _SUIT_LABELS[bisect_right(_SUIT_LABEL_THRESHOLDS, score)]
+    return {"score": round(score, 2), "label": label}
+
+def _assess_weather_risks(weather_data):
+    rainfall = weather_data["rainfall"]
+    if rainfall < 100:
+        drought = "high"
+    elif rainfall < 300:
+        drought = "medium"
+    elif rainfall < 500:
+        drought = "low"
+    else:
+        drought = "none"
+
+    if rainfall > 1800:
+        flood = "high"
+    elif rainfall > 1200:
+        flood = "medium"
+    else:
+        flood = "none"
+
+    frost = weather_data["frost_risk"]
+
+    humidity = weather_data["humidity"]
+    if humidity > 80 and rainfall > 800:
+        disease = "high"
+    elif humidity > 70:
+        disease = "medium"
+    else:
+        disease = "low"
+
+    return {
+        "drought": {"level": drought},
+        "flood": {"level": flood},
+        "frost": {"level": frost},
+        "disease": {"level": disease},
+    }
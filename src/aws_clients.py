@@ -0,0 +1,22 @@
+import functools
+from config import AWS_REGION
+
+@functools.cache
+def get_bedrock():
+    """Build the shared Bedrock client on first use.
+
+    boto3 alone costs ~300-500 ms to import on a Lambda cold start, so
+    the import and client construction are deferred until a code path
+    actually needs Bedrock. TCP keep-alive avoids a fresh TCP+TLS
+    handshake on every call in a warm container, and adaptive retries
+    back off gracefully when Bedrock throttles.
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        tcp_keepalive=True,
+        retries={"mode": "adaptive", "max_attempts": 3},
+        max_pool_connections=32,
+    )
+    return boto3.client("bedrock-runtime", region_name=AWS_REGION, config=config)
@@ -6,5 +6,27 @@ PINECONE_INDEX = os.environ.get("PINECONE_INDEX", "farmer-rag-index")
 
 S3_BUCKET = os.environ.get("S3_BUCKET")
 
+# DynamoDB table for learned soil profiles, pincode locations and
+# weather observations
+LEARNING_TABLE = os.environ.get("LEARNING_TABLE", "farmer-learning")
+
+# Number of documents retrieved per query
+TOP_K = int(os.environ.get("TOP_K", "5"))
+
 EMBED_MODEL = os.environ.get("EMBED_MODEL", "amazon.titan-embed-text-v2")
 LLM_MODEL = os.environ.get("LLM_MODEL", "anthropic.claude-3-haiku-20240307-v1:0")
+
+# Bedrock latency-optimized inference (only some region/model combos support it)
+LATENCY_OPTIMIZED = os.environ.get("LATENCY_OPTIMIZED", "true").lower() == "true"
+
+# Below this soil AND weather confidence, crop planning returns a
+# fallback instead of running retrieval and economics
+PLAN_LOW_CONF_GATE = float(os.environ.get("PLAN_LOW_CONF_GATE", "0.3"))
+
+# Skip RAG retrieval in the soil agent when the query already states a
+# soil type and pH - the documents contribute nothing in that case
+SOIL_RAG_SKIP_WHEN_COMPLETE = os.environ.get("SOIL_RAG_SKIP_WHEN_COMPLETE", "true").lower() == "true"
+
+# Store/query int8-quantized vectors (~4x smaller; index must be ingested
+# with the same setting)
+QUANTIZE_VECTORS = os.environ.get("QUANTIZE_VECTORS", "false").lower() == "true"
@@ -0,0 +1,54 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+from embeddings.embed import embed_text
+from config import S3_BUCKET
+
+CACHE_DIR = Path(os.environ.get("EMBED_CACHE_DIR", "/tmp/embed_cache"))
+S3_PREFIX = "embed-cache/"
+
+def _cache_key(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def _s3_fetch(key, path):
+    """Pull a cached vector from S3 into the local cache, if configured."""
+    if not S3_BUCKET:
+        return False
+    try:
+        import boto3
+        boto3.client("s3").download_file(S3_BUCKET, S3_PREFIX + key, str(path))
+        return True
+    except Exception:
+        return False
+
+def _s3_store(key, path):
+    if not S3_BUCKET:
+        return
+    try:
+        import boto3
+        boto3.client("s3").upload_file(str(path), S3_BUCKET, S3_PREFIX + key)
+    except Exception:
+        pass
+
+def cached_embed(text):
+    """embed_text with a persistent SHA-256-keyed cache.
+
+    Vectors are stored as float32 .npy files under /tmp (optionally
+    mirrored to S3 so they survive cold containers), so re-running
+    ingestion over an unchanged CSV is I/O-bound instead of
+    Bedrock-bound and costs no Titan tokens.
+    """
+    key = _cache_key(text)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{key}.npy"
+
+    if path.exists() or _s3_fetch(key, path):
+        return np.load(path)
+
+    vector = embed_text(text)
+    np.save(path, vector)
+    _s3_store(key, path)
+    return vector
@@ -1,14 +1,18 @@
-import boto3
-from config import AWS_REGION, EMBED_MODEL
-
-bedrock = boto3.client("bedrock-runtime", region_name=AWS_REGION)
+import functools
+import numpy as np
+from aws_clients import get_bedrock
+from config import EMBED_MODEL
+from utils import jsonio
 
+@functools.lru_cache(maxsize=1024)
 def embed_text(text):
-    response = bedrock.invoke_model(
+    response = get_bedrock().invoke_model(
         modelId=EMBED_MODEL,
         contentType="application/json",
         accept="application/json",
-        body='{"inputText": "' + text.replace('"', "'") + '"}'
+        body=jsonio.dumps_bytes({"inputText": text})
     )
-    result = response["body"].read().decode()
-    return eval(result)["embedding"]
+    result = jsonio.loads(response["body"].read())
+    # float32 ndarray: ~4 KB for a 1024-dim vector vs ~52 KB as a list of
+    # Python floats, and Pinecone serializes contiguous buffers faster
+    return np.asarray(result["embedding"], dtype=np.float32)
@@ -1,11 +1,80 @@
-from pinecone import Pinecone
-from config import PINECONE_API_KEY, PINECONE_INDEX
+import functools
+from config import PINECONE_API_KEY, PINECONE_INDEX, QUANTIZE_VECTORS
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX)
+def quantize_int8(vector):
+    """L2-normalize and scale a vector to int8 (SQ8).
+
+    ~4x fewer bytes on the wire and in the index with negligible recall
+    loss on cosine indices. Both the ingestion and the query path must
+    apply the same scheme, so this is gated by the shared
+    QUANTIZE_VECTORS config flag.
+    """
+    import numpy as np
+
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    if norm:
+        v = v / norm
+    return np.clip(np.round(v * 127), -128, 127).astype(np.int8)
+
+def _prepare(vector):
+    return quantize_int8(vector) if QUANTIZE_VECTORS else vector
+
+@functools.cache
+def get_index():
+    """Build the shared Pinecone index handle on first use.
+
+    Importing the pinecone SDK and opening the index connection are
+    deferred so cold starts that never touch the vector store pay
+    nothing for it.
+    """
+    try:
+        # gRPC transport is materially faster for queries and supports
+        # parallel upserts; requires the pinecone[grpc] extra
+        from pinecone.grpc import PineconeGRPC as Pinecone
+    except ImportError:
+        from pinecone import Pinecone
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    return pc.Index(PINECONE_INDEX)
 
 def store_embedding(id, vector, metadata):
-    index.upsert(vectors=[(id, vector, metadata)])
+    get_index().upsert(vectors=[(id, _prepare(vector), metadata)])
+
+def query_embedding(vector, top_k=5, filter=None):
+    # include_values=False: only metadata is consumed downstream, so
+    # don't ship 4 KB of floats back per match
+    return get_index().query(
+        vector=_prepare(vector),
+        top_k=top_k,
+        include_metadata=True,
+        include_values=False,
+        filter=filter,
+    ).matches
+
+def query_embeddings_batch(vectors, top_k=5, filter=None):
+    """Query several vectors concurrently and return matches per vector.
+
+    Pinecone's query API is single-vector, so the closest thing to a
+    server-side batch is client-side fan-out over a thread pool — the
+    requests fly in parallel instead of paying one round trip each.
+    Swap to a native batch query if/when the SDK grows one.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not vectors:
+        return []
+
+    index = get_index()
+
+    def _query(vector):
+        return index.query(
+            vector=_prepare(vector),
+            top_k=top_k,
+            include_metadata=True,
+            include_values=False,
+            filter=filter,
+        ).matches
 
-def query_embedding(vector, top_k=5):
-    return index.query(vector=vector, top_k=top_k, include_metadata=True).matches
+    with ThreadPoolExecutor(max_workers=min(len(vectors), 8)) as executor:
+        return list(executor.map(_query, vectors))
@@ -1,19 +1,74 @@
-from rag.retrieve import retrieve_documents
-from rag.prompt import build_prompt
-from llm.bedrock_client import call_llm
+import hashlib
+import os
+
+from utils import jsonio
 from utils.logger import logger
+from utils.ttl_cache import TTLCache
+
+def json_response(payload, status=200):
+    """Serialize a dict payload into an API Gateway response.
+
+    Goes through jsonio so orjson does the encoding when available —
+    the agent responses nest several dicts (npk_levels, micronutrients,
+    location_context) and stdlib json.dumps is measurably slower on
+    them. Use this for every dict body so the boundary stays in one
+    place.
+    """
+    return {
+        "statusCode": status,
+        "headers": {"Content-Type": "application/json"},
+        "body": jsonio.dumps(payload),
+    }
+
+# Full (query -> response) cache: hot repeated queries short-circuit the
+# whole embed + retrieve + LLM pipeline within a warm container
+_RESPONSE_CACHE = TTLCache(maxsize=512, ttl=3600)
+
+def _warm_up():
+    """Prime connections during the Lambda INIT phase.
+
+    INIT-phase CPU is free under provisioned concurrency and runs before
+    the latency SLA starts, so pay for the Bedrock credential chain and
+    the Pinecone TLS handshake here instead of on the first user query.
+    """
+    try:
+        from aws_clients import get_bedrock
+        get_bedrock()
+        from embeddings.pinecone_client import get_index
+        get_index().describe_index_stats()
+    except Exception:
+        # Warmup is best-effort — a failure here surfaces properly on
+        # the first real call
+        pass
+
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    _warm_up()
 
 def lambda_handler(event, context):
+    # Heavy imports (boto3, pinecone) are deferred so the Lambda INIT
+    # phase stays cheap; the client factories behind these cache on
+    # first use
+    from rag.retrieve import retrieve_documents
+    from rag.prompt import build_prompt
+    from llm.bedrock_client import call_llm
+
     logger.info(event)
 
     query = event["queryStringParameters"]["query"]
 
+    cache_key = hashlib.sha256(query.encode()).digest()
+    cached = _RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     docs = retrieve_documents(query)
     prompt = build_prompt(query, docs)
     answer = call_llm(prompt)
 
-    return {
+    response = {
         "statusCode": 200,
         "headers": {"Content-Type": "application/json"},
         "body": answer
     }
+    _RESPONSE_CACHE.put(cache_key, response)
+    return response
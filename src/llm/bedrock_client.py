@@ -1,27 +1,67 @@
-import boto3
-import json
-from config import AWS_REGION, LLM_MODEL
+from aws_clients import get_bedrock
+from config import LLM_MODEL, LATENCY_OPTIMIZED
+from utils import jsonio
 
-bedrock = boto3.client("bedrock-runtime", region_name=AWS_REGION)
+# Flipped off at runtime if the region/model combo rejects the flag
+_latency_optimized = LATENCY_OPTIMIZED
+
+def _invoke(prompt, stream):
+    global _latency_optimized
+
+    from botocore.exceptions import ClientError, ParamValidationError
+
+    bedrock = get_bedrock()
+    kwargs = {
+        "modelId": LLM_MODEL,
+        "contentType": "application/json",
+        "accept": "application/json",
+        "body": jsonio.dumps_bytes({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1024,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }),
+    }
+
+    invoke = bedrock.invoke_model_with_response_stream if stream else bedrock.invoke_model
+
+    if _latency_optimized:
+        try:
+            return invoke(performanceConfigLatency="optimized", **kwargs)
+        except ParamValidationError:
+            # Older botocore without the kwarg in its service model —
+            # fall back permanently
+            _latency_optimized = False
+        except ClientError as e:
+            # Only an unsupported region/model combo disables the flag;
+            # throttling, auth and other transient errors propagate
+            if e.response.get("Error", {}).get("Code") != "ValidationException":
+                raise
+            _latency_optimized = False
+
+    return invoke(**kwargs)
+
+def call_llm_stream(prompt):
+    """Yield answer text chunks as Bedrock generates them.
+
+    First chunk arrives at first-token latency (~100 ms) instead of
+    full-response latency, so callers that can stream (Lambda response
+    streaming / Function URLs) should consume this directly.
+    """
+    response = _invoke(prompt, stream=True)
+    for event in response["body"]:
+        chunk = jsonio.loads(event["chunk"]["bytes"])
+        if chunk.get("type") == "content_block_delta":
+            text = chunk["delta"].get("text")
+            if text:
+                yield text
 
 def call_llm(prompt):
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 1024,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    })
-    
-    response = bedrock.invoke_model(
-        modelId=LLM_MODEL,
-        contentType="application/json",
-        accept="application/json",
-        body=body
-    )
-    
-    result = json.loads(response["body"].read().decode())
-    return result["content"][0]["text"]
+    # Buffered fallback for callers that need the whole answer (API
+    # Gateway GET). Parsing chunks as they arrive avoids holding a second
+    # full copy of the response body in memory.
+    return "".join(call_llm_stream(prompt))
@@ -1,9 +1,27 @@
+import asyncio
+
+import numpy as np
+
 from embeddings.embed import embed_text
 from embeddings.pinecone_client import query_embedding
+from config import TOP_K
+
+def top_k_by_score(candidates, top_k, key=lambda c: c["score"]):
+    """Select the top_k highest-scoring candidates client-side.
 
-def retrieve_documents(query):
+    np.argpartition is O(N) versus O(N log N) for a full sort; only the
+    k winners get sorted. Use this wherever we over-fetch from Pinecone
+    and re-rank locally (MMR diversification, score fusion)."""
+    if len(candidates) <= top_k:
+        return sorted(candidates, key=key, reverse=True)
+    scores = np.fromiter((key(c) for c in candidates), dtype=np.float32, count=len(candidates))
+    idx = np.argpartition(scores, -top_k)[-top_k:]
+    idx = idx[np.argsort(-scores[idx])]
+    return [candidates[i] for i in idx]
+
+def retrieve_documents(query, top_k=None, filter=None):
     query_vector = embed_text(query)
-    results = query_embedding(query_vector, top_k=5)
+    results = query_embedding(query_vector, top_k=top_k or TOP_K, filter=filter)
     docs = []
     for match in results:
         docs.append({
@@ -12,3 +30,31 @@ def retrieve_documents(query):
             "metadata": match.metadata
         })
     return docs
+
+def retrieve_documents_batch(queries, top_k=None, filter=None):
+    """Retrieve documents for several queries in one concurrent fan-out.
+
+    Duplicate queries collapse to a single embed + search; results come
+    back in input order. The embed and Pinecone round trips for the
+    whole batch overlap instead of running one query at a time.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not queries:
+        return []
+
+    unique = list(dict.fromkeys(queries))
+
+    def _retrieve(query):
+        return retrieve_documents(query, top_k=top_k, filter=filter)
+
+    with ThreadPoolExecutor(max_workers=min(len(unique), 8)) as executor:
+        per_query = dict(zip(unique, executor.map(_retrieve, unique)))
+    return [per_query[query] for query in queries]
+
+async def retrieve_documents_async(query, top_k=None):
+    """Async wrapper so concurrent callers (e.g. multiple agents) can
+    overlap their embed + query round trips instead of paying them
+    sequentially. Single-query callers should keep using the sync path.
+    """
+    return await asyncio.to_thread(retrieve_documents, query, top_k)
@@ -0,0 +1,14 @@
+"""Optional numba shim.
+
+numba is an optional accelerator: when present, decorated numeric cores
+are compiled once (cache=True persists across Lambda cold starts);
+without it the undecorated Python function runs as-is.
+"""
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
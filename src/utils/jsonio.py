@@ -0,0 +1,29 @@
+"""JSON helpers backed by orjson when available.
+
+orjson.dumps is 2-10x faster than stdlib json and returns bytes
+directly (no .encode() pass); orjson.loads is 2-3x faster. Falls back
+to the stdlib so the optional dependency never becomes a hard one.
+"""
+
+try:
+    import orjson as _orjson
+
+    def dumps(obj):
+        """Serialize to a JSON str."""
+        return _orjson.dumps(obj).decode()
+
+    def dumps_bytes(obj):
+        """Serialize to JSON bytes (no intermediate str)."""
+        return _orjson.dumps(obj)
+
+    loads = _orjson.loads
+except ImportError:
+    import json as _json
+
+    def dumps(obj):
+        return _json.dumps(obj)
+
+    def dumps_bytes(obj):
+        return _json.dumps(obj).encode()
+
+    loads = _json.loads